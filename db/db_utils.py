@@ -1,11 +1,17 @@
 import oracledb
 import os
+import logging
+import threading
+from contextlib import contextmanager
+from cachetools import TTLCache
 from dotenv import load_dotenv
 from datetime import datetime
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Database credentials
 username = os.getenv('ORACLE_USER', 'ADMIN')
 password = os.getenv('ORACLE_PASSWORD')
@@ -14,26 +20,126 @@ password = os.getenv('ORACLE_PASSWORD')
 # No wallet needed since database is now configured for TLS-only (not mTLS)
 dsn = os.getenv('ORACLE_DSN')
 
-def get_db_connection():
-    """Create and return a database connection"""
+# Session pool sizing. Requests are served by worker threads (see gunicorn.conf.py),
+# so by default allow one session per thread rather than queueing threads on the pool
+pool_min = int(os.getenv('ORACLE_POOL_MIN', 2))
+pool_max = int(os.getenv('ORACLE_POOL_MAX', os.getenv('GUNICORN_THREADS', 16)))
+# How long a request waits for a free session before failing, rather than hanging
+# until the worker times out (milliseconds)
+pool_wait_timeout = int(os.getenv('ORACLE_POOL_WAIT_TIMEOUT', 5000))
+
+def create_pool():
+    """Create the session pool shared by every helper in this module"""
     try:
         # Connect using TLS (one-way) - wallet parameters removed
-        connection = oracledb.connect(
+        return oracledb.create_pool(
+            user=username,
+            password=password,
+            dsn=dsn,
+            min=pool_min,
+            max=pool_max,
+            increment=1,
+            getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+            wait_timeout=pool_wait_timeout,
+            # Close sessions above pool_min after 5 idle minutes, and ping a session
+            # that has sat idle for over a minute before handing it out, so a
+            # connection dropped by the network is replaced instead of failing a request
+            timeout=300,
+            ping_interval=60,
+            # Pooled sessions outlive a request, so their statement caches keep
+            # our handful of statements parsed across calls
+            stmtcachesize=50
+        )
+    except oracledb.Error as error:
+        logger.error("Error creating database pool: %s", error)
+        raise
+
+# Standalone scripts can set DB_POOL_DISABLED to open plain connections instead
+pool = None if os.getenv('DB_POOL_DISABLED') else create_pool()
+
+# Bind types for the athlete table's columns. Declaring them up front gives every
+# execute the same bind metadata, so cached statements are reused as-is
+_ATHLETE_BIND_TYPES = {
+    'id': oracledb.DB_TYPE_NUMBER,
+    'firstname': 255,
+    'lastname': 255,
+    'access_token': 255,
+    'ref_token': 255,
+    'exp_at': oracledb.DB_TYPE_NUMBER,
+    'firstlogin': oracledb.DB_TYPE_TIMESTAMP,
+    'lastlogin': oracledb.DB_TYPE_TIMESTAMP,
+    'now': oracledb.DB_TYPE_TIMESTAMP,
+}
+
+@contextmanager
+def autocommit(connection):
+    """Commit each statement with its execute round-trip, then put the connection
+    back in its previous mode so the pool never hands out a session left in autocommit"""
+    previous = connection.autocommit
+    connection.autocommit = True
+    try:
+        yield
+    finally:
+        connection.autocommit = previous
+
+def _execute_athlete_write(cursor, sql, binds):
+    cursor.setinputsizes(**{name: _ATHLETE_BIND_TYPES[name] for name in binds})
+    cursor.execute(sql, binds)
+
+def get_db_connection():
+    """Return a database connection, from the pool when one exists (close() releases it back)"""
+    try:
+        if pool is not None:
+            return pool.acquire()
+        return oracledb.connect(
             user=username,
             password=password,
             dsn=dsn
         )
-        return connection
     except oracledb.Error as error:
-        print(f"Error connecting to database: {error}")
+        logger.error("Error connecting to database: %s", error)
         raise
 
+# Short-lived in-process cache of athlete rows, so authenticated requests don't
+# hit the database every time. Updates below write through to the cached row;
+# inserts and upserts evict it.
+# ATHLETE_CACHE_TTL=0 turns the cache off.
+athlete_cache_ttl = int(os.getenv('ATHLETE_CACHE_TTL', 60))
+_athlete_cache = TTLCache(maxsize=int(os.getenv('ATHLETE_CACHE_SIZE', 10_000)), ttl=athlete_cache_ttl)
+_athlete_cache_lock = threading.Lock()
+
+# Dict keys for the columns selected by get_athlete_by_id, in SELECT order
+_ATHLETE_COLUMNS = ('strava_id', 'firstname', 'lastname', 'firstlogin', 'lastlogin',
+                    'access_token', 'refresh_token', 'expires_at')
+
+def _athlete_row(*values):
+    return dict(zip(_ATHLETE_COLUMNS, values))
+
+def _evict_athlete(strava_athlete_id):
+    with _athlete_cache_lock:
+        _athlete_cache.pop(strava_athlete_id, None)
+
+def _update_cached_athlete(strava_athlete_id, **changes):
+    """Write changed columns through to a cached athlete row, so the next lookup needn't reload it"""
+    with _athlete_cache_lock:
+        cached = _athlete_cache.get(strava_athlete_id)
+        if cached is not None:
+            # Replace rather than mutate: readers may be copying the old dict right now
+            _athlete_cache[strava_athlete_id] = {**cached, **changes}
+
 def get_athlete_by_id(strava_athlete_id):
-    """Fetch athlete data from database by Strava ID"""
-    connection = get_db_connection()
-    cursor = connection.cursor()
+    """Fetch athlete data by Strava ID, from the cache when fresh or else the database"""
+    with _athlete_cache_lock:
+        cached = _athlete_cache.get(strava_athlete_id)
+    if cached is not None:
+        # Callers may update the dict they get back, so hand out a copy
+        return dict(cached)
     
-    try:
+    with get_db_connection() as connection, connection.cursor() as cursor:
+        # Primary key lookup returns at most one row: prefetch it (plus end-of-fetch)
+        # with the execute and skip allocating the default 100-row fetch buffer
+        cursor.prefetchrows = 2
+        cursor.arraysize = 1
         cursor.execute("""
             SELECT StravaAthleteID, firstname, lastname, firstlogin, lastlogin, 
                    access_token, ref_token, exp_at
@@ -41,97 +147,233 @@ def get_athlete_by_id(strava_athlete_id):
             WHERE StravaAthleteID = :id
         """, [strava_athlete_id])
         
-        result = cursor.fetchone()
+        cursor.rowfactory = _athlete_row
+        athlete = cursor.fetchone()
         
-        if result:
-            return {
-                'strava_id': result[0],
-                'firstname': result[1],
-                'lastname': result[2],
-                'firstlogin': result[3],
-                'lastlogin': result[4],
-                'access_token': result[5],
-                'refresh_token': result[6],
-                'expires_at': result[7]
-            }
+        if athlete:
+            if athlete_cache_ttl > 0:
+                with _athlete_cache_lock:
+                    _athlete_cache[strava_athlete_id] = athlete
+            return dict(athlete)
         return None
-    finally:
-        cursor.close()
-        connection.close()
 
 def create_athlete(strava_athlete_id, firstname, lastname, access_token, refresh_token, expires_at):
     """Insert new athlete into database"""
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    
-    try:
-        now = datetime.now()
-        cursor.execute("""
-            INSERT INTO athlete 
-            (StravaAthleteID, firstname, lastname, firstlogin, lastlogin, 
-             access_token, ref_token, exp_at)
-            VALUES (:id, :firstname, :lastname, :firstlogin, :lastlogin, 
-                    :access_token, :ref_token, :exp_at)
-        """, [strava_athlete_id, firstname, lastname, now, now, 
-              access_token, refresh_token, expires_at])
-        
-        connection.commit()
-        return True
-    except oracledb.Error as error:
-        print(f"Error creating athlete: {error}")
-        connection.rollback()
-        raise
-    finally:
-        cursor.close()
-        connection.close()
+    with get_db_connection() as connection, connection.cursor() as cursor, autocommit(connection):
+        try:
+            now = datetime.now()
+            _execute_athlete_write(cursor, """
+                INSERT INTO athlete 
+                (StravaAthleteID, firstname, lastname, firstlogin, lastlogin, 
+                 access_token, ref_token, exp_at)
+                VALUES (:id, :firstname, :lastname, :firstlogin, :lastlogin, 
+                        :access_token, :ref_token, :exp_at)
+            """, {
+                'id': strava_athlete_id,
+                'firstname': firstname,
+                'lastname': lastname,
+                'firstlogin': now,
+                'lastlogin': now,
+                'access_token': access_token,
+                'ref_token': refresh_token,
+                'exp_at': expires_at
+            })
+            _evict_athlete(strava_athlete_id)
+            return True
+        except oracledb.Error as error:
+            logger.error("Error creating athlete: %s", error)
+            connection.rollback()
+            raise
 
 def update_athlete_tokens(strava_athlete_id, access_token, refresh_token, expires_at):
     """Update athlete's Strava tokens"""
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    
-    try:
-        now = datetime.now()
-        cursor.execute("""
-            UPDATE athlete
-            SET access_token = :access_token,
-                ref_token = :ref_token,
-                exp_at = :exp_at,
-                lastlogin = :lastlogin
-            WHERE StravaAthleteID = :id
-        """, [access_token, refresh_token, expires_at, now, strava_athlete_id])
-        
-        connection.commit()
-        return True
-    except oracledb.Error as error:
-        print(f"Error updating athlete tokens: {error}")
-        connection.rollback()
-        raise
-    finally:
-        cursor.close()
-        connection.close()
+    with get_db_connection() as connection, connection.cursor() as cursor, autocommit(connection):
+        try:
+            now = datetime.now()
+            _execute_athlete_write(cursor, """
+                UPDATE athlete
+                SET access_token = :access_token,
+                    ref_token = :ref_token,
+                    exp_at = :exp_at,
+                    lastlogin = :lastlogin
+                WHERE StravaAthleteID = :id
+            """, {
+                'access_token': access_token,
+                'ref_token': refresh_token,
+                'exp_at': expires_at,
+                'lastlogin': now,
+                'id': strava_athlete_id
+            })
+            _update_cached_athlete(strava_athlete_id, access_token=access_token, refresh_token=refresh_token,
+                                   expires_at=expires_at, lastlogin=now)
+            return True
+        except oracledb.Error as error:
+            logger.error("Error updating athlete tokens: %s", error)
+            connection.rollback()
+            raise
 
 def update_athlete_name(strava_athlete_id, firstname, lastname):
     """Update athlete's name (in case they changed it on Strava)"""
-    connection = get_db_connection()
-    cursor = connection.cursor()
-    
-    try:
-        cursor.execute("""
-            UPDATE athlete
-            SET firstname = :firstname,
-                lastname = :lastname
-            WHERE StravaAthleteID = :id
-        """, [firstname, lastname, strava_athlete_id])
-        
-        connection.commit()
-        return True
-    except oracledb.Error as error:
-        print(f"Error updating athlete name: {error}")
+    with get_db_connection() as connection, connection.cursor() as cursor, autocommit(connection):
+        try:
+            _execute_athlete_write(cursor, """
+                UPDATE athlete
+                SET firstname = :firstname,
+                    lastname = :lastname
+                WHERE StravaAthleteID = :id
+            """, {
+                'firstname': firstname,
+                'lastname': lastname,
+                'id': strava_athlete_id
+            })
+            _update_cached_athlete(strava_athlete_id, firstname=firstname, lastname=lastname)
+            return True
+        except oracledb.Error as error:
+            logger.error("Error updating athlete name: %s", error)
+            connection.rollback()
+            raise
+
+def upsert_athlete(strava_athlete_id, firstname, lastname, access_token, refresh_token, expires_at):
+    """Insert a new athlete or refresh an existing one's name and tokens in a single round-trip"""
+    with get_db_connection() as connection, connection.cursor() as cursor, autocommit(connection):
+        try:
+            now = datetime.now()
+            _execute_athlete_write(cursor, """
+                MERGE INTO athlete a
+                USING (SELECT :id AS StravaAthleteID FROM dual) src
+                ON (a.StravaAthleteID = src.StravaAthleteID)
+                WHEN MATCHED THEN UPDATE
+                    SET firstname = :firstname,
+                        lastname = :lastname,
+                        access_token = :access_token,
+                        ref_token = :ref_token,
+                        exp_at = :exp_at,
+                        lastlogin = :now
+                WHEN NOT MATCHED THEN INSERT
+                    (StravaAthleteID, firstname, lastname, firstlogin, lastlogin,
+                     access_token, ref_token, exp_at)
+                    VALUES (:id, :firstname, :lastname, :now, :now,
+                            :access_token, :ref_token, :exp_at)
+            """, {
+                'id': strava_athlete_id,
+                'firstname': firstname,
+                'lastname': lastname,
+                'access_token': access_token,
+                'ref_token': refresh_token,
+                'exp_at': expires_at,
+                'now': now
+            })
+            _evict_athlete(strava_athlete_id)
+            return True
+        except oracledb.Error as error:
+            logger.error("Error upserting athlete: %s", error)
+            connection.rollback()
+            raise
+
+def _refresh_locked_athlete(connection, cursor, strava_athlete_id, expires_before, refresh):
+    """Lock the athlete's row (skipping it if already locked), refresh its tokens if still expiring and commit.
+    The connection must not be in autocommit, or the lock ends before the refresh. True if refreshed."""
+    cursor.execute("""
+        SELECT ref_token
+        FROM athlete
+        WHERE StravaAthleteID = :id AND exp_at < :expires_before
+        FOR UPDATE SKIP LOCKED
+    """, {'id': strava_athlete_id, 'expires_before': expires_before})
+    row = cursor.fetchone()
+    if row is None:
         connection.rollback()
-        raise
-    finally:
-        cursor.close()
-        connection.close()
+        return False
+    
+    _save_refreshed_tokens(connection, cursor, strava_athlete_id, *refresh(row[0]))
+    return True
+
+def _save_refreshed_tokens(connection, cursor, strava_athlete_id, access_token, refresh_token, expires_at):
+    """Store tokens from a refresh of a locked athlete row, commit and write them through to the cache"""
+    # lastlogin is left alone so only real logins keep an athlete active
+    _execute_athlete_write(cursor, """
+        UPDATE athlete
+        SET access_token = :access_token,
+            ref_token = :ref_token,
+            exp_at = :exp_at
+        WHERE StravaAthleteID = :id
+    """, {
+        'access_token': access_token,
+        'ref_token': refresh_token,
+        'exp_at': expires_at,
+        'id': strava_athlete_id
+    })
+    connection.commit()
+    _update_cached_athlete(strava_athlete_id, access_token=access_token,
+                           refresh_token=refresh_token, expires_at=expires_at)
+
+def refresh_athlete_tokens(strava_athlete_id, expires_before, refresh):
+    """Refresh one athlete's tokens if they expire before expires_before and no one else is doing so; True if refreshed.
+    refresh(refresh_token) must return (access_token, refresh_token, expires_at)."""
+    with get_db_connection() as connection, connection.cursor() as cursor:
+        # The row lock must last until the commit after the Strava call
+        connection.autocommit = False
+        try:
+            return _refresh_locked_athlete(connection, cursor, strava_athlete_id, expires_before, refresh)
+        except Exception as error:
+            logger.warning("Could not refresh tokens for athlete %s: %s", strava_athlete_id, error)
+            connection.rollback()
+            raise
+
+# Longest a request waits (seconds) for another refresh of the same athlete to finish
+REFRESH_LOCK_WAIT = 30
 
+def get_fresh_athlete_tokens(strava_athlete_id, expires_before, refresh):
+    """Return the athlete's (access_token, refresh_token, expires_at), refreshed first if they expire before expires_before.
+    Waits for a refresh already holding the row lock and reuses its tokens instead of spending the refresh token again."""
+    with get_db_connection() as connection, connection.cursor() as cursor:
+        # The row lock must last until the commit after the Strava call
+        connection.autocommit = False
+        try:
+            cursor.execute(f"""
+                SELECT access_token, ref_token, exp_at
+                FROM athlete
+                WHERE StravaAthleteID = :id
+                FOR UPDATE WAIT {REFRESH_LOCK_WAIT}
+            """, [strava_athlete_id])
+            row = cursor.fetchone()
+            if row is None:
+                raise ValueError(f"Athlete {strava_athlete_id} not found")
+            access_token, refresh_token, expires_at = row
+            if expires_at >= expires_before:
+                # Refreshed by someone else while we waited for the lock
+                connection.rollback()
+                _update_cached_athlete(strava_athlete_id, access_token=access_token,
+                                       refresh_token=refresh_token, expires_at=expires_at)
+                return access_token, refresh_token, expires_at
+            
+            tokens = refresh(refresh_token)
+            _save_refreshed_tokens(connection, cursor, strava_athlete_id, *tokens)
+            return tokens
+        except Exception as error:
+            logger.warning("Could not refresh tokens for athlete %s: %s", strava_athlete_id, error)
+            connection.rollback()
+            raise
 
+def refresh_expiring_tokens(expires_before, active_since, refresh):
+    """Refresh recently active athletes' tokens expiring before expires_before; returns how many were refreshed.
+    Each row is locked with SKIP LOCKED and committed on its own, so workers never refresh the same athlete."""
+    with get_db_connection() as connection, connection.cursor() as cursor:
+        # Each row lock must last until the commit after its Strava call
+        connection.autocommit = False
+        cursor.execute("""
+            SELECT StravaAthleteID
+            FROM athlete
+            WHERE exp_at < :expires_before
+              AND lastlogin >= :active_since
+        """, {'expires_before': expires_before, 'active_since': active_since})
+        expiring = [row[0] for row in cursor.fetchall()]
+        
+        refreshed = 0
+        for strava_athlete_id in expiring:
+            try:
+                if _refresh_locked_athlete(connection, cursor, strava_athlete_id, expires_before, refresh):
+                    refreshed += 1
+            except Exception as error:
+                logger.warning("Could not refresh tokens for athlete %s: %s", strava_athlete_id, error)
+                connection.rollback()
+        return refreshed
@@ -0,0 +1,17 @@
+-- Converts athlete.exp_at from TIMESTAMP to a NUMBER(10) Unix timestamp.
+--
+-- Run this BEFORE deploying a backend version that stores exp_at as a Unix
+-- timestamp: the new code can't read or write the old TIMESTAMP column
+-- (token checks fail with a TypeError, logins with ORA-00932).
+-- Skip it for databases created from schemas.sql, which already have NUMBER(10).
+--
+-- Every stored token is marked expired (exp_at = 0), so each athlete's token is
+-- refreshed on their next request instead of converting timestamps across zones.
+
+ALTER TABLE athlete ADD (exp_at_epoch NUMBER(10) DEFAULT 0);
+ALTER TABLE athlete DROP COLUMN exp_at;
+ALTER TABLE athlete RENAME COLUMN exp_at_epoch TO exp_at;
+
+-- Lets the background token refresher find soon-to-expire tokens without
+-- scanning the whole table
+CREATE INDEX athlete_exp_at_idx ON athlete (exp_at);
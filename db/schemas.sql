@@ -6,6 +6,12 @@ CREATE TABLE athlete (
   lastlogin TIMESTAMP,
   access_token VARCHAR2(255),
   ref_token VARCHAR2(255),
-  exp_at TIMESTAMP
+  exp_at NUMBER(10) -- Strava access token expiry, Unix timestamp
 );
 
+-- Lets the background token refresher find soon-to-expire tokens without
+-- scanning the whole table (lookups by athlete use the primary key)
+CREATE INDEX athlete_exp_at_idx ON athlete (exp_at);
+
+-- Migrating an existing table from the old TIMESTAMP exp_at column: run
+-- db/migrate_exp_at_epoch.sql before deploying (see RENDER_DEPLOY.md)
@@ -0,0 +1,15 @@
+# Gunicorn configuration, picked up automatically by `gunicorn main:app`
+#
+# Almost all request time is spent waiting on Strava and Oracle, so each
+# worker runs a pool of threads to keep serving requests while others block
+# on network I/O.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 3011)}"
+# GUNICORN_WORKER_CLASS=gevent swaps threads for greenlets (gevent must be installed);
+# worker_connections then caps concurrent requests per worker
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', "gthread")
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 16))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
@@ -1,138 +1,384 @@
-from stravalib import Client
-from datetime import datetime
+from datetime import datetime, timedelta
+from collections import deque
 from db import db_utils as db
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import requests
+import orjson
+import logging
+import queue
+import threading
 import time
+import os
 
-def get_token_from_code(auth_client, code, CLIENT_ID, CLIENT_SECRET):
+logger = logging.getLogger(__name__)
+
+# Strava returns at most this many activities per page
+STRAVA_PAGE_SIZE = 200
+# How many pages to request from Strava at once when fetching a whole date range
+STRAVA_PARALLEL_PAGES = int(os.getenv('STRAVA_PARALLEL_PAGES', 4))
+# Most pages fetched for one request (whole range or pages=), so one wide date
+# range can't page without limit against the app-wide Strava rate limit
+STRAVA_MAX_PAGES = 20
+_page_pool = ThreadPoolExecutor(max_workers=STRAVA_PARALLEL_PAGES)
+
+# Shared session so TCP/TLS connections to Strava are kept alive and reused across requests.
+# Enough pooled connections for every request thread plus the page-fetch pool
+_strava_session = requests.Session()
+_strava_session.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=int(os.getenv('GUNICORN_THREADS', 16)) + STRAVA_PARALLEL_PAGES,
+    # Retry dropped connections and Strava gateway errors with a short backoff.
+    # urllib3 only retries idempotent methods by default, so the token POSTs
+    # (which may rotate the refresh token) are never sent twice; 429 rate limits
+    # aren't retried either
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=(502, 503, 504))
+))
+
+STRAVA_TOKEN_URL = "https://www.strava.com/oauth/token"
+
+def get_token_from_code(code, CLIENT_ID, CLIENT_SECRET):
+    """Exchange an OAuth code for Strava tokens, plus the athlete summary Strava includes with them"""
     try:
-        token_response = auth_client.exchange_code_for_token(
-            CLIENT_ID, CLIENT_SECRET, code=code
-        )
+        response = _strava_session.post(STRAVA_TOKEN_URL, data={
+            'client_id': CLIENT_ID,
+            'client_secret': CLIENT_SECRET,
+            'code': code,
+            'grant_type': 'authorization_code'
+        }, timeout=10)
+        response.raise_for_status()
+        token_response = response.json()
     except Exception as e:
-        print({'type': 'ERROR', 'message': str(e)})
-        return {'type': 'ERROR', 'message': str(e)}, 500
+        logger.error("Error exchanging auth code for tokens: %s", e)
+        raise
 
-    if 'access_token' in token_response and 'refresh_token' in token_response:
+    if 'access_token' in token_response and 'refresh_token' in token_response and 'athlete' in token_response:
         access_token = token_response['access_token']
         refresh_token = token_response['refresh_token']
-        # expires_at is a Unix timestamp
-        expires_at = datetime.fromtimestamp(token_response['expires_at']) if 'expires_at' in token_response else None
-        # print("expires_at: ", expires_at)
-        # print("access_token: ", access_token)
-        # print("refresh_token: ", refresh_token)
-        return access_token, refresh_token, expires_at
+        # expires_at is a Unix timestamp; keep it as an int
+        expires_at = token_response.get('expires_at')
+        return access_token, refresh_token, expires_at, token_response['athlete']
     else:
         raise ValueError("Strava response missing tokens")
 
+# Query log rows are buffered here and written in batches by a background thread,
+# so logging never adds a database round-trip to the request
+_query_log_queue = queue.Queue()
+QUERY_LOG_BATCH_SIZE = 200
+QUERY_LOG_FLUSH_INTERVAL = 0.5  # seconds
+# Queued by flush_query_logs to have the writer finish its batch and exit
+_QUERY_LOG_STOP = object()
+
 def log_query(athlete_id, start_date, end_date):
-    """Log an activities query to the database"""
-    connection = db.get_db_connection()
-    cursor = connection.cursor()
+    """Queue an activities query to be logged to the database (fire-and-forget)"""
+    _query_log_queue.put_nowait((athlete_id, datetime.now(), start_date, end_date))
+    return True
+
+def _query_log_row(athlete_id, querytime, start_date, end_date):
+    # Convert Unix timestamps to datetime objects (handle string or int)
+    return (athlete_id, querytime,
+            datetime.fromtimestamp(int(start_date)),
+            datetime.fromtimestamp(int(end_date)))
+
+def _write_query_logs(entries):
+    """Insert a batch of queued query log entries with a single executemany"""
+    rows = []
+    for entry in entries:
+        try:
+            rows.append(_query_log_row(*entry))
+        except (TypeError, ValueError) as error:
+            logger.warning("Dropping query log entry %s: %s", entry, error)
+    if not rows:
+        return
     
-    try:
-        now = datetime.now()
-        # Convert Unix timestamps to datetime objects (handle string or int)
-        start_datetime = datetime.fromtimestamp(int(start_date))
-        end_datetime = datetime.fromtimestamp(int(end_date))
-        
-        cursor.execute("""
-            INSERT INTO queries 
-            (athlete_id, querytime, startdate, enddate)
-            VALUES (:athlete_id, :querytime, :startdate, :enddate)
-        """, [athlete_id, now, start_datetime, end_datetime])
-        
-        connection.commit()
-        return True
-    except Exception as error:
-        print(f"Error logging query: {error}")
-        connection.rollback()
-        raise
-    finally:
-        cursor.close()
-        connection.close()
+    with db.get_db_connection() as connection, connection.cursor() as cursor, db.autocommit(connection):
+        try:
+            cursor.executemany("""
+                INSERT INTO queries 
+                (athlete_id, querytime, startdate, enddate)
+                VALUES (:athlete_id, :querytime, :startdate, :enddate)
+            """, rows)
+        except Exception as error:
+            logger.error("Error logging %d queries: %s", len(rows), error)
+            connection.rollback()
+            raise
+
+def _query_log_writer():
+    """Drain the query log queue, flushing every QUERY_LOG_BATCH_SIZE rows or QUERY_LOG_FLUSH_INTERVAL seconds"""
+    stopping = False
+    while not stopping:
+        entry = _query_log_queue.get()
+        if entry is _QUERY_LOG_STOP:
+            return
+        batch = [entry]
+        deadline = time.monotonic() + QUERY_LOG_FLUSH_INTERVAL
+        while len(batch) < QUERY_LOG_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = _query_log_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is _QUERY_LOG_STOP:
+                stopping = True
+                break
+            batch.append(entry)
+        try:
+            _write_query_logs(batch)
+        except Exception:
+            # Already logged; keep the writer alive for the next batch
+            pass
+
+_query_log_thread = threading.Thread(target=_query_log_writer, name='query-log-writer', daemon=True)
+_query_log_thread.start()
+
+def flush_query_logs(timeout=10):
+    """Stop the writer thread once it has written everything queued so far, including its current batch.
+    Register it with atexit after the log listener's stop, so it runs first and its errors are still logged."""
+    _query_log_queue.put(_QUERY_LOG_STOP)
+    _query_log_thread.join(timeout)
 
 
 def refresh_strava_token(refresh_token, CLIENT_ID, CLIENT_SECRET):
-    """Refresh an expired Strava access token"""
+    """Refresh a Strava access token; Strava may rotate the refresh token, so the new one is returned too"""
     try:
-        auth_client = Client()
-        token_response = auth_client.refresh_access_token(
-            CLIENT_ID, CLIENT_SECRET, refresh_token
-        )
+        response = _strava_session.post(STRAVA_TOKEN_URL, data={
+            'client_id': CLIENT_ID,
+            'client_secret': CLIENT_SECRET,
+            'refresh_token': refresh_token,
+            'grant_type': 'refresh_token'
+        }, timeout=10)
+        response.raise_for_status()
+        token_response = response.json()
         
         access_token = token_response['access_token']
-        expires_at = datetime.fromtimestamp(token_response['expires_at'])
-        
-        # Refresh token stays the same with Strava
-        return access_token, expires_at
+        new_refresh_token = token_response.get('refresh_token', refresh_token)
+        expires_at = token_response['expires_at']  # Unix timestamp
+        return access_token, new_refresh_token, expires_at
     except Exception as e:
-        print(f"Error refreshing token: {e}")
+        logger.error("Error refreshing token: %s", e)
         raise
 
+# Tokens close to expiry are refreshed in the background, so requests rarely
+# have to stop and refresh one themselves. TOKEN_REFRESH_INTERVAL=0 turns this off.
+TOKEN_REFRESH_INTERVAL = int(os.getenv('TOKEN_REFRESH_INTERVAL', 300))  # seconds
+TOKEN_REFRESH_LOOKAHEAD = int(os.getenv('TOKEN_REFRESH_LOOKAHEAD', 900))  # seconds
+# Only athletes who logged in within the session JWT's lifetime can still make requests
+TOKEN_REFRESH_ACTIVE_WINDOW = timedelta(days=30)
+
+def _token_refresher(CLIENT_ID, CLIENT_SECRET):
+    """Every TOKEN_REFRESH_INTERVAL seconds, refresh tokens expiring within TOKEN_REFRESH_LOOKAHEAD"""
+    def refresh(refresh_token):
+        return refresh_strava_token(refresh_token, CLIENT_ID, CLIENT_SECRET)
+    
+    while True:
+        try:
+            refreshed = db.refresh_expiring_tokens(
+                int(time.time()) + TOKEN_REFRESH_LOOKAHEAD,
+                datetime.now() - TOKEN_REFRESH_ACTIVE_WINDOW,
+                refresh
+            )
+            if refreshed:
+                logger.info("Refreshed Strava tokens for %d athletes ahead of expiry", refreshed)
+        except Exception as error:
+            # Keep the refresher alive; requests still refresh expired tokens themselves
+            logger.error("Background token refresh failed: %s", error)
+        time.sleep(TOKEN_REFRESH_INTERVAL)
+
+def start_token_refresher(CLIENT_ID, CLIENT_SECRET):
+    """Start the background token refresher thread for this process"""
+    if TOKEN_REFRESH_INTERVAL <= 0:
+        return
+    threading.Thread(target=_token_refresher, args=(CLIENT_ID, CLIENT_SECRET),
+                     name='token-refresher', daemon=True).start()
+
+# A token this close to expiry (seconds) is treated as expired, so it can't lapse
+# partway through a request's Strava calls
+TOKEN_EXPIRY_MARGIN = 60
+
+def token_expired(athlete):
+    """Whether the athlete's access token is expired, or within TOKEN_EXPIRY_MARGIN of it"""
+    return athlete['expires_at'] <= time.time() + TOKEN_EXPIRY_MARGIN
+
+def refresh_token_now(athlete, CLIENT_ID, CLIENT_SECRET, margin=TOKEN_EXPIRY_MARGIN):
+    """Refresh the athlete's token under its row lock (or take the tokens of a refresh
+    already running) and update the athlete dict with them"""
+    athlete['access_token'], athlete['refresh_token'], athlete['expires_at'] = db.get_fresh_athlete_tokens(
+        athlete['strava_id'], int(time.time()) + margin + 1,
+        lambda refresh_token: refresh_strava_token(refresh_token, CLIENT_ID, CLIENT_SECRET)
+    )
+    return athlete
+
+# A request whose token is still valid but expires within TOKEN_REFRESH_AHEAD seconds
+# carries on with it and leaves the refresh to a background thread
+TOKEN_REFRESH_AHEAD = int(os.getenv('TOKEN_REFRESH_AHEAD', 600))
+_refresh_pool = ThreadPoolExecutor(max_workers=2)
+# Athletes with a refresh-ahead already queued or running in this process
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+def refresh_token_ahead(athlete, CLIENT_ID, CLIENT_SECRET):
+    """Refresh the athlete's token in the background if it is valid but close to expiring (one at a time per athlete)"""
+    now = int(time.time())
+    if token_expired(athlete) or athlete['expires_at'] > now + TOKEN_REFRESH_AHEAD:
+        return
+    strava_athlete_id = athlete['strava_id']
+    with _refreshing_lock:
+        if strava_athlete_id in _refreshing:
+            return
+        _refreshing.add(strava_athlete_id)
+    _refresh_pool.submit(_refresh_ahead, strava_athlete_id, now + TOKEN_REFRESH_AHEAD, CLIENT_ID, CLIENT_SECRET)
+
+def _refresh_ahead(strava_athlete_id, expires_before, CLIENT_ID, CLIENT_SECRET):
+    try:
+        db.refresh_athlete_tokens(
+            strava_athlete_id, expires_before,
+            lambda refresh_token: refresh_strava_token(refresh_token, CLIENT_ID, CLIENT_SECRET)
+        )
+    except Exception:
+        # Already logged; the request path refreshes synchronously once the token expires
+        pass
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(strava_athlete_id)
+
 # legacy function for fetching activities through stravalib
 def get_valid_strava_client(athlete, CLIENT_ID, CLIENT_SECRET):
     # Get a Strava client with a valid access token, refreshing if needed
+    # stravalib pulls in pydantic and pint; only import it for this legacy path
+    from stravalib import Client
     
     # Check if token is expired or about to expire (within 5 minutes)
-    now = datetime.now()
-    expires_at = athlete['expires_at']
-    
-    if expires_at <= now:
-        # Token is expired, refresh it
-        new_access_token, new_refresh_token, new_expires_at = refresh_strava_token(
-            athlete['refresh_token'], CLIENT_ID, CLIENT_SECRET
-        )
-        
-        # Update database with new tokens
-        db.update_athlete_tokens(
-            athlete['strava_id'], 
-            new_access_token, 
-            new_refresh_token, 
-            new_expires_at
-        )
-        
-        return Client(access_token=new_access_token)
-    else:
-        # Token is still valid
-        return Client(access_token=athlete['access_token'])
+    if athlete['expires_at'] <= int(time.time()) + 300:
+        # Token is expired, refresh it (under the row lock, like every other refresh)
+        refresh_token_now(athlete, CLIENT_ID, CLIENT_SECRET, margin=300)
+    return Client(access_token=athlete['access_token'], requests_session=_strava_session)
+
 
+STRAVA_ACTIVITIES_URL = "https://www.strava.com/api/v3/athlete/activities"
 
-def fetch_activities(athlete, after_epoch, before_epoch, page):
+# Recently fetched activity pages, keyed by (athlete, after, before, page), so
+# re-requesting the same range skips Strava (and its rate limit) for a while.
+# Kept short so newly uploaded activities still show up promptly. Bounded by the
+# total size of the cached bodies (a full page is roughly half a megabyte), since
+# every worker process holds its own copy.
+# STRAVA_CACHE_TTL=0 turns the cache off.
+strava_cache_ttl = int(os.getenv('STRAVA_CACHE_TTL', 300))
+_activities_cache = TTLCache(maxsize=int(os.getenv('STRAVA_CACHE_MB', 8)) * 1024 * 1024, ttl=strava_cache_ttl,
+                             getsizeof=lambda page: len(page[0]))
+_activities_cache_lock = threading.Lock()
+
+class StravaFetchError(Exception):
+    """A page of activities could not be fetched from Strava"""
+
+def _strava_auth_headers(athlete):
+    return {'Authorization': f'Bearer {athlete["access_token"]}'}
+
+def fetch_activity_pages_json(athlete, after_epoch, before_epoch, pages):
+    """Fetch pages concurrently and splice them into one JSON array's bytes, in the order listed, plus the count.
+    Raises StravaFetchError if any page fails."""
+    headers = _strava_auth_headers(athlete)
+    if len(pages) == 1:
+        return _fetch_activities_page(athlete['strava_id'], headers, after_epoch, before_epoch, pages[0])
+    results = list(_page_pool.map(
+        lambda p: _fetch_activities_page(athlete['strava_id'], headers, after_epoch, before_epoch, page=p), pages
+    ))
+    body = b'[' + b','.join(page_body.strip()[1:-1] for page_body, count in results if count) + b']'
+    return body, sum(count for _, count in results)
+
+def _fetch_activities_page(strava_athlete_id, headers, after_epoch, before_epoch, page):
+    """Return (raw JSON body, activity count) for one page, from the cache when fresh; raises StravaFetchError if the request fails"""
+    key = (strava_athlete_id, str(after_epoch), str(before_epoch), str(page))
+    with _activities_cache_lock:
+        cached = _activities_cache.get(key)
+    if cached is not None:
+        logger.debug("[TIMING] Strava activities cache hit (page %s)", page)
+        return cached
     
-    # Fetch one page of activities from Strava API
+    try:
+        result = _request_activities_page(headers, after_epoch, before_epoch, page)
+    except Exception as e:
+        logger.error("Error fetching activities: %s", e)
+        # An empty page would pass for the end of the range, so fail loudly instead
+        raise StravaFetchError(f"Could not fetch activities page {page}") from e
     
-    # Make the API call (page 1, up to 200 activities)
-    url = f"https://www.strava.com/api/v3/athlete/activities?after={after_epoch}&before={before_epoch}&page={page}&per_page=200"
+    # Failed requests never reach here, so an error is never cached
+    if strava_cache_ttl > 0:
+        with _activities_cache_lock:
+            try:
+                _activities_cache[key] = result
+            except ValueError:
+                pass  # A single page bigger than the whole cache just isn't cached
+    return result
+
+def _request_activities_page(headers, after_epoch, before_epoch, page):
+    """Request one page from Strava and return (raw JSON body, activity count); raises if it fails"""
     
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {athlete["access_token"]}'
+    # Make the API call (up to STRAVA_PAGE_SIZE activities)
+    params = {
+        'after': after_epoch,
+        'before': before_epoch,
+        'page': page,
+        'per_page': STRAVA_PAGE_SIZE
     }
     
+    # Time the Strava API call
+    strava_start = time.time()
+    response = _strava_session.get(STRAVA_ACTIVITIES_URL, params=params, headers=headers, timeout=10)
+    strava_end = time.time()
+    strava_duration = (strava_end - strava_start) * 1000  # Convert to milliseconds
+    
+    logger.debug("[TIMING] Strava API call (page %s): %.2fms", page, strava_duration)
+    
+    # Check if the response is successful (status code 200-299)
+    if not response.ok:
+        raise requests.HTTPError(f"Strava activities request failed (page {page}): status {response.status_code}")
+    
+    # Time JSON parsing
+    parse_start = time.time()
+    activities = orjson.loads(response.content)
+    if not isinstance(activities, list):
+        raise ValueError(f"Unexpected Strava activities response (page {page})")
+    parse_end = time.time()
+    parse_duration = (parse_end - parse_start) * 1000
+    
+    logger.debug("[TIMING] JSON parsing (page %s): %.2fms - Fetched %d activities", page, parse_duration, len(activities))
+    # Keep only the bytes: much smaller than the parsed dicts, and written into responses as-is
+    return response.content, len(activities)
+
+
+def iter_activity_pages(athlete, after_epoch, before_epoch):
+    """Yield (raw JSON body, activity count) for each page in the date range, in order, as each arrives.
+    Raises StravaFetchError if a page fails or the range runs past STRAVA_MAX_PAGES."""
+    # Build the auth headers once for the whole range
+    strava_athlete_id, headers = athlete['strava_id'], _strava_auth_headers(athlete)
+    
+    def fetch(page):
+        return _fetch_activities_page(strava_athlete_id, headers, after_epoch, before_epoch, page=page)
+    
+    first_page = fetch(1)
+    yield first_page
+    if first_page[1] < STRAVA_PAGE_SIZE:
+        return
+    
+    in_flight = deque()
+    next_page = 2
     try:
-        # Time the Strava API call
-        strava_start = time.time()
-        response = requests.get(url, headers=headers)
-        strava_end = time.time()
-        strava_duration = (strava_end - strava_start) * 1000  # Convert to milliseconds
-        
-        print(f"[TIMING] Strava API call (page {page}): {strava_duration:.2f}ms")
-        
-        # Check if the response is successful (status code 200-299)
-        if not response.ok:
-            print(f"Error: Response status {response.status_code}")
-            return []  # Return empty array on error
-        
-        # Time JSON parsing
-        parse_start = time.time()
-        activities = response.json()
-        parse_end = time.time()
-        parse_duration = (parse_end - parse_start) * 1000
-        
-        print(f"[TIMING] JSON parsing (page {page}): {parse_duration:.2f}ms - Fetched {len(activities)} activities")
-        return activities
-        
-    except Exception as e:
-        print(f"Error fetching activities: {e}")
-        return []  # Return empty array on exception
+        # Page 1 was full: keep a window of later pages in flight until a short page ends the range
+        while True:
+            while len(in_flight) < STRAVA_PARALLEL_PAGES and next_page <= STRAVA_MAX_PAGES:
+                in_flight.append(_page_pool.submit(fetch, next_page))
+                next_page += 1
+            if not in_flight:
+                raise StravaFetchError(f"Date range has more than {STRAVA_MAX_PAGES} pages of activities")
+            page_result = in_flight.popleft().result()
+            yield page_result
+            if page_result[1] < STRAVA_PAGE_SIZE:
+                return
+    finally:
+        # Done, failed or abandoned by the client: don't start any pages still queued
+        for future in in_flight:
+            future.cancel()
@@ -1,14 +1,22 @@
-from flask import Flask, request, jsonify, make_response, g
+from flask import Flask, request, jsonify, g
+from flask.json.provider import DefaultJSONProvider
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity, set_access_cookies, unset_jwt_cookies
 from dotenv import load_dotenv
-from stravalib import Client
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener
+from cachetools import TTLCache
+from datetime import timedelta
 import helpers as h
+import orjson
 from db import db_utils as db
 import os
 import logging
 import argparse
+import atexit
+import hashlib
+import itertools
+import queue
+import threading
 import time
 
 load_dotenv()
@@ -19,32 +27,98 @@ SECURE = os.getenv('SECURE') == 'true' # convert t/f string to boolean
 JWT_SECRET = os.getenv('JWT_SECRET')
 
 # Set up logging
+# Request threads only put records on a queue; a listener thread formats them
+# and does the (blocking) write to stderr
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+_log_queue = queue.SimpleQueue()
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter(
+    fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     datefmt='%Y-%m-%d %H:%M:%S'
-)
+))
+# format='%(message)s' so records are only merged with their args before queueing,
+# not formatted twice
+logging.basicConfig(handlers=[QueueHandler(_log_queue)], format='%(message)s')
+_log_listener = QueueListener(_log_queue, _log_handler)
+_log_listener.start()
+# Flush anything still queued on shutdown
+atexit.register(_log_listener.stop)
+# atexit runs handlers last-registered first: write out pending query logs while
+# the listener can still report any errors doing so
+atexit.register(h.flush_query_logs)
+
+# Per-request [TIMING] lines go to their own logger, which stays quiet unless
+# TIMING=1 is set (or the dev server runs with -v), so busy production workers
+# don't create and queue several log records for every request
+timing_logger = logging.getLogger(f"{__name__}.timing")
+timing_logger.setLevel(logging.INFO if os.getenv('TIMING') == '1' else logging.WARNING)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, so jsonify and request.get_json skip the stdlib encoder"""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
+
+class HealthCheckMiddleware:
+    """WSGI middleware answering health checks (CORS headers included) from a prebuilt response, before Flask sees them"""
+    # RENDER_DEPLOY.md points uptime monitors at /health, so answer there too
+    PATHS = frozenset(('/api/health', '/health'))
+    BODY = orjson.dumps({"status": "ok", "service": "runsum-backend"})
+    HEADERS = [('Content-Type', 'application/json'), ('Content-Length', str(len(BODY))), ('Vary', 'Origin')]
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') not in self.PATHS:
+            return self.wsgi_app(environ, start_response)
+        headers = list(self.HEADERS)
+        origin = environ.get('HTTP_ORIGIN')
+        if origin in ALLOWED_ORIGINS:
+            headers.append(('Access-Control-Allow-Origin', origin))
+            headers.extend(_CORS_HEADERS)
+            if environ.get('REQUEST_METHOD') == 'OPTIONS':
+                headers.append(('Access-Control-Max-Age', _CORS_MAX_AGE_HEADER))
+        start_response('200 OK', headers)
+        return [self.BODY]
+
+app.wsgi_app = HealthCheckMiddleware(app.wsgi_app)
 
 # Enable CORS - simplified for same-origin deployment
 # When both frontend and backend are on runsum.harrylons.com, CORS is minimal
 # Still allow FRONTEND_URL for backward compatibility during transition
-CORS(app, resources={r"/*": {"origins": [FRONTEND_URL, "https://runsum.harrylons.com", "http://localhost:3010"]}}, 
+ALLOWED_ORIGINS = frozenset(origin for origin in (FRONTEND_URL, "https://runsum.harrylons.com", "http://localhost:3010") if origin)
+# Let browsers cache preflight results for a day (they cap this themselves, e.g.
+# Chrome at 2 hours) instead of sending an OPTIONS before every API call
+CORS_MAX_AGE = 86400
+CORS(app, resources={r"/*": {"origins": list(ALLOWED_ORIGINS)}}, 
      supports_credentials=True,
-     expose_headers=['Set-Cookie'])
+     expose_headers=['Set-Cookie'],
+     max_age=CORS_MAX_AGE)
+
+# Headers added for an allowed origin, alongside Access-Control-Allow-Origin itself
+_CORS_HEADERS = (
+    ('Access-Control-Allow-Credentials', 'true'),
+    ('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-CSRF-TOKEN'),
+    ('Access-Control-Allow-Methods', 'GET,POST,PUT,DELETE,OPTIONS'),
+)
+_CORS_MAX_AGE_HEADER = str(CORS_MAX_AGE)
 
 # Add after_request handler to ensure CORS headers are present on ALL responses (including redirects)
 @app.after_request
 def after_request(response):
     """Ensure CORS headers are present on all responses, including errors and redirects"""
     origin = request.headers.get('Origin')
-    allowed_origins = [FRONTEND_URL, "https://runsum.harrylons.com", "http://localhost:3010"]
-    if origin in allowed_origins:
+    if origin in ALLOWED_ORIGINS:
         response.headers['Access-Control-Allow-Origin'] = origin
-        response.headers['Access-Control-Allow-Credentials'] = 'true'
-        response.headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization,X-CSRF-TOKEN'
-        response.headers['Access-Control-Allow-Methods'] = 'GET,POST,PUT,DELETE,OPTIONS'
+        response.headers.update(_CORS_HEADERS)
+        if request.method == 'OPTIONS':
+            response.headers['Access-Control-Max-Age'] = _CORS_MAX_AGE_HEADER
     return response
 
 # Flask-JWT-Extended configuration
@@ -67,42 +141,93 @@ app.config["JWT_COOKIE_DOMAIN"] = COOKIE_DOMAIN
 # CSRF Cookie Configuration - must match JWT cookie settings
 app.config["JWT_CSRF_IN_COOKIES"] = True
 app.config["JWT_CSRF_CHECK_FORM"] = False  # Only check headers
+# Only state-changing requests need the double-submit check; reads like GET
+# /api/activities are still authenticated by the signed cookie
+app.config["JWT_CSRF_METHODS"] = ["POST", "PUT", "PATCH", "DELETE"]
 app.config["JWT_ACCESS_CSRF_COOKIE_NAME"] = "csrf_access_token"
 app.config["JWT_ACCESS_CSRF_COOKIE_PATH"] = "/"
 app.config["JWT_ACCESS_CSRF_COOKIE_SAMESITE"] = SAMESITE_SETTING  # Must match JWT cookie
 app.config["JWT_ACCESS_CSRF_COOKIE_SECURE"] = SECURE  # Must match JWT cookie
 app.config["JWT_ACCESS_CSRF_COOKIE_DOMAIN"] = COOKIE_DOMAIN  # Must match JWT cookie
 
-jwt = JWTManager(app)
+class CachingJWTManager(JWTManager):
+    """JWTManager that skips re-verifying recently verified tokens, never caching one past its own exp.
+    Only successful decodes are cached; the CSRF value is part of the key."""
+    def __init__(self, app=None, ttl=30, maxsize=10_000, **kwargs):
+        self._verified = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._verified_lock = threading.Lock()
+        super().__init__(app, **kwargs)
+
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        key = (encoded_token, csrf_value, allow_expired)
+        with self._verified_lock:
+            payload = self._verified.get(key)
+        if payload is not None and (allow_expired or payload.get("exp", 0) > time.time()):
+            return payload
+        
+        payload = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        with self._verified_lock:
+            self._verified[key] = payload
+        return payload
+
+jwt = CachingJWTManager(app)
+
+# HS256 signs with the secret as raw bytes. Hand the library the encoded key
+# directly rather than having it re-read and re-encode JWT_SECRET_KEY per token.
+# Left to the defaults when unset, so the library still reports the missing secret
+if JWT_SECRET:
+    _jwt_key = JWT_SECRET.encode()
+
+    @jwt.encode_key_loader
+    def jwt_encode_key(identity):
+        return _jwt_key
+
+    @jwt.decode_key_loader
+    def jwt_decode_key(jwt_header, jwt_payload):
+        return _jwt_key
+
+# Refresh Strava tokens before they expire so get_activities rarely has to
+h.start_token_refresher(CLIENT_ID, CLIENT_SECRET)
+
+# Fixed-shape error bodies, serialized once at import; only errors that carry
+# exception text are built per request
+_ERR_UNAUTHORIZED = orjson.dumps({"error": "Missing or invalid authentication token"})
+_ERR_INVALID_TOKEN = orjson.dumps({"error": "Invalid authentication token"})
+_ERR_EXPIRED_TOKEN = orjson.dumps({"error": "Token has expired"})
+_ERR_AUTH_FAILED = orjson.dumps({"error": "Failed to authenticate"})
+_ERR_USER_NOT_FOUND = orjson.dumps({"error": "User not found in database"})
+_ERR_WHOAMI_FAILED = orjson.dumps({"error": "Failed to fetch user information"})
+
+def _json_response(body, status):
+    """Wrap pre-serialized JSON bytes in a response"""
+    return app.response_class(body, status=status, mimetype='application/json')
 
 # JWT error handlers
 @jwt.unauthorized_loader
 def unauthorized_callback(callback):
-    logger.warning(f"Unauthorized access attempt: {callback}")
-    logger.debug(f"Request cookies: {request.cookies}")
-    return jsonify({"error": "Missing or invalid authentication token"}), 401
+    logger.warning("Unauthorized access attempt: %s", callback)
+    logger.debug("Request cookies: %s", request.cookies)
+    return _json_response(_ERR_UNAUTHORIZED, 401)
 
 @jwt.invalid_token_loader
 def invalid_token_callback(callback):
-    logger.warning(f"Invalid token: {callback}")
-    return jsonify({"error": "Invalid authentication token"}), 401
+    logger.warning("Invalid token: %s", callback)
+    return _json_response(_ERR_INVALID_TOKEN, 401)
 
 @jwt.expired_token_loader
 def expired_token_callback(jwt_header, jwt_payload):
-    logger.warning(f"Expired token for user: {jwt_payload.get('sub', 'unknown')}")
-    return jsonify({"error": "Token has expired"}), 401
-
-# Strava client
-auth_client = Client()
+    logger.warning("Expired token for user: %s", jwt_payload.get('sub', 'unknown'))
+    return _json_response(_ERR_EXPIRED_TOKEN, 401)
 
 @app.route("/")
 def home():
     return "Hello HTTPS!"
 
-@app.route("/api/health")
-def health_check():
-    """Lightweight health check endpoint for uptime monitoring"""
-    return {"status": "ok", "service": "runsum-backend"}, 200
+def _current_athlete():
+    """The logged-in athlete's row (None if unknown), loaded at most once per request; call only inside a jwt_required view"""
+    if 'athlete' not in g:
+        g.athlete = db.get_athlete_by_id(get_jwt_identity()["id"])
+    return g.athlete
 
 ###############
 # AUTH ROUTES #
@@ -114,92 +239,71 @@ def authenticate_me():
         logger.info("Login attempt received")
         data = request.get_json()
         code = data['code']
-        logger.debug(f"Auth code received (length: {len(code)})")
+        logger.debug("Auth code received (length: %d)", len(code))
         
         # Exchange auth code for Strava tokens
         logger.info("Exchanging auth code for Strava tokens")
-        acc_tok, ref_tok, exp_at = h.get_token_from_code(
-            auth_client, code, CLIENT_ID=CLIENT_ID, CLIENT_SECRET=CLIENT_SECRET
+        acc_tok, ref_tok, exp_at, athlete = h.get_token_from_code(
+            code, CLIENT_ID=CLIENT_ID, CLIENT_SECRET=CLIENT_SECRET
         )
-        logger.debug(f"Access token obtained (expires at: {exp_at})")
-        
-        temp_client = Client(access_token=acc_tok)
-        logger.info("Fetching athlete information from Strava")
-        athlete = temp_client.get_athlete()
-        logger.info(f"Athlete fetched: {athlete.firstname} {athlete.lastname} (ID: {athlete.id})")
+        logger.debug("Access token obtained (expires at: %s)", exp_at)
+        logger.info("Athlete from token exchange: %s %s (ID: %s)", athlete['firstname'], athlete['lastname'], athlete['id'])
         
         # Create or update athlete in database
-        existing_athlete = db.get_athlete_by_id(athlete.id)
-        if existing_athlete:
-            logger.info(f"Updating existing athlete in database (ID: {athlete.id})")
-            db.update_athlete_tokens(athlete.id, acc_tok, ref_tok, exp_at)
-            db.update_athlete_name(athlete.id, athlete.firstname, athlete.lastname)
-        else:
-            logger.info(f"Creating new athlete in database (ID: {athlete.id})")
-            db.create_athlete(
-                athlete.id, 
-                athlete.firstname, 
-                athlete.lastname,
-                acc_tok, 
-                ref_tok, 
-                exp_at
-            )
+        logger.info("Upserting athlete in database (ID: %s)", athlete['id'])
+        db.upsert_athlete(
+            athlete['id'],
+            athlete['firstname'],
+            athlete['lastname'],
+            acc_tok,
+            ref_tok,
+            exp_at
+        )
         
         # Create JWT for session management
         athleteIdentity = {
-            "id": athlete.id,
-            "first_name": athlete.firstname
+            "id": athlete['id'],
+            "first_name": athlete['firstname']
         }
         logger.info("Creating JWT for session management")
         JWT = create_access_token(identity=athleteIdentity, expires_delta=timedelta(days=30))
         
         resp = jsonify({
-            "first_name": athlete.firstname, 
-            "id": athlete.id,
+            "first_name": athlete['firstname'], 
+            "id": athlete['id'],
             "success": True
         })
         set_access_cookies(resp, JWT)
-        logger.info(f"Login successful for athlete ID: {athlete.id}")
+        logger.info("Login successful for athlete ID: %s", athlete['id'])
         
         return resp, 200
     
     except Exception as e:
-        logger.error(f"Authentication failed: {str(e)}", exc_info=True)
-        return jsonify({"error": "Failed to authenticate"}), 500
+        logger.error("Authentication failed: %s", e, exc_info=True)
+        return _json_response(_ERR_AUTH_FAILED, 500)
     
+# Fixed-shape response bodies, serialized once rather than on every request
+_LOGOUT_BODY = orjson.dumps({"msg": "logout successful"})
+_WHOAMI_TEMPLATE = b'{"first_name":%s,"last_name":%s,"id":%s,"success":true}'
+
+# set_cookie arguments that expire the session cookies on the same domain they were set with
+_CLEAR_JWT_KW = dict(value='', max_age=0, expires=0, path='/', domain=COOKIE_DOMAIN,
+                     secure=SECURE, httponly=True, samesite=SAMESITE_SETTING)
+_CLEAR_CSRF_KW = {**_CLEAR_JWT_KW, 'httponly': False}  # CSRF tokens are not httponly
+
 @app.route('/api/auth/logout', methods=['POST'])
 def logout_with_cookies():
     logger.info("Logout request received")
-    response = jsonify({"msg": "logout successful"})
+    response = app.response_class(_LOGOUT_BODY, mimetype='application/json')
     unset_jwt_cookies(response)
     
     # Manually clear cookies with explicit domain settings for production
     # This ensures cookies are properly cleared with the same domain they were set with
     if COOKIE_DOMAIN:
         # Clear the JWT access token cookie
-        response.set_cookie(
-            'access_token_cookie',
-            value='',
-            max_age=0,
-            expires=0,
-            path='/',
-            domain=COOKIE_DOMAIN,
-            secure=SECURE,
-            httponly=True,
-            samesite=SAMESITE_SETTING
-        )
+        response.set_cookie('access_token_cookie', **_CLEAR_JWT_KW)
         # Clear the CSRF token cookie
-        response.set_cookie(
-            'csrf_access_token',
-            value='',
-            max_age=0,
-            expires=0,
-            path='/',
-            domain=COOKIE_DOMAIN,
-            secure=SECURE,
-            httponly=False,  # CSRF tokens are not httponly
-            samesite=SAMESITE_SETTING
-        )
+        response.set_cookie('csrf_access_token', **_CLEAR_CSRF_KW)
     
     logger.info("Logout successful")
     return response
@@ -210,102 +314,168 @@ def who_am_i():
     try:
         logger.info("Who am I request received")
         user = get_jwt_identity()
-        logger.debug(f"JWT identity: {user}")
-        athlete = db.get_athlete_by_id(user["id"])
+        logger.debug("JWT identity: %s", user)
+        athlete = _current_athlete()
         
         if not athlete:
-            logger.warning(f"User not found in database (ID: {user['id']})")
-            return jsonify({"error": "User not found in database"}), 404
+            logger.warning("User not found in database (ID: %s)", user['id'])
+            return _json_response(_ERR_USER_NOT_FOUND, 404)
         
-        logger.info(f"User information fetched for athlete ID: {athlete['strava_id']}")
-        resp = make_response(
-            jsonify({
-                "first_name": athlete['firstname'],
-                "last_name": athlete['lastname'],
-                "id": athlete['strava_id'],
-                "success": True
-            })
+        logger.info("User information fetched for athlete ID: %s", athlete['strava_id'])
+        # Only the values vary; each is still JSON-encoded (and escaped) by orjson
+        resp = app.response_class(
+            _WHOAMI_TEMPLATE % (
+                orjson.dumps(athlete['firstname']),
+                orjson.dumps(athlete['lastname']),
+                orjson.dumps(athlete['strava_id'])
+            ),
+            mimetype='application/json'
         )
         return resp, 200
     
     except Exception as e:
-        logger.error(f"Failed to fetch user information: {str(e)}", exc_info=True)
-        return jsonify({"error": "Failed to fetch user information"}), 500
+        logger.error("Failed to fetch user information: %s", e, exc_info=True)
+        return _json_response(_ERR_WHOAMI_FAILED, 500)
 
 ##############
 # ACTIVITIES #
 ##############
-@app.route('/api/activities', methods=['GET'])
+def stream_activities(pages, request_start):
+    """Yield the {"activities", "count", "success"} body one Strava page at a time, spliced in as Strava sent it.
+    A page failing after the 200 has gone out closes the object with "success":false instead."""
+    yield b'{"activities":['
+    count = 0
+    try:
+        for body, page_count in pages:
+            if not page_count:
+                continue
+            if count:
+                yield b','
+            yield body.strip()[1:-1]
+            count += page_count
+    except h.StravaFetchError as e:
+        logger.error("Streamed activities response cut short: %s", e)
+        yield b'],"count":%d,"success":false,"msg":%s}' % (count, orjson.dumps(str(e)))
+        return
+    yield b'],"count":%d,"success":true}' % count
+    
+    total_duration = (time.time() - request_start) * 1000
+    timing_logger.info("[TIMING] Total streamed endpoint time: %.2fms - Returned %d activities", total_duration, count)
+
+# Most pages one request may ask for with pages=
+MAX_PAGES_PER_REQUEST = h.STRAVA_MAX_PAGES
+_ERR_MISSING_DATES = orjson.dumps({"msg": "Missing start or end date in request"})
+_ERR_PAGE_AND_PAGES = orjson.dumps({"msg": "Use either page or pages, not both"})
+_ERR_BAD_PARAMS = orjson.dumps({"msg": "after and before must be Unix timestamps and pages integers"})
+_ERR_BAD_PAGES = orjson.dumps({"msg": f"pages must be 1 or greater, at most {MAX_PAGES_PER_REQUEST} at a time"})
+_ERR_STRAVA_FETCH = orjson.dumps({"msg": "Could not fetch activities from Strava", "success": False})
+# How long (seconds) a browser may reuse a page/pages response before revalidating its ETag
+ACTIVITIES_MAX_AGE = 30
+
+# /api/activities/range always returns the whole date range (Strava pages are
+# fetched in parallel and streamed); /api/activities does the same unless given a page
+@app.route('/api/activities', methods=['GET'], defaults={'whole_range': False})
+@app.route('/api/activities/range', methods=['GET'], defaults={'whole_range': True})
 @jwt_required()
-def get_activities():
+def get_activities(whole_range):
     request_start = time.time()
     try:
-        logger.info(f"[TIMING] Get activities request received - Page {request.args.get('page')}")
+        # page=N fetches one page; pages=1,2,3 fetches several at once, in parallel
+        page = None if whole_range else request.args.get('page')
+        pages = None if whole_range else request.args.get('pages')
+        timing_logger.info("[TIMING] Get activities request received - Page %s", page or pages)
         after = request.args.get('after')
         before = request.args.get('before')
-        page = request.args.get('page')
-        logger.debug(f"Query parameters - after: {after}, before: {before}")
+        logger.debug("Query parameters - after: %s, before: %s", after, before)
         
         if before is None or after is None:
             logger.warning("Missing date parameters in request")
-            return jsonify({"msg": "Missing start or end date in request"}), 400 # 400 Bad Request
-
-        if page is None:
-            logger.warning("Missing page parameter in request")
-            return jsonify({"msg": "Missing page parameter in activities request"}), 400 # 400 Bad Request
+            return _json_response(_ERR_MISSING_DATES, 400) # 400 Bad Request
+        
+        if page is not None and pages is not None:
+            logger.warning("Both page and pages in request")
+            return _json_response(_ERR_PAGE_AND_PAGES, 400)
         
+        # after/before are Unix timestamps and pages 1-based page numbers; reject
+        # anything else here rather than sending it on to Strava
+        try:
+            after, before = int(after), int(before)
+            if page is not None:
+                pages = [int(page)]
+            elif pages is not None:
+                pages = [int(p) for p in pages.split(',')]
+        except ValueError:
+            logger.warning("Invalid date or page parameters in request")
+            return _json_response(_ERR_BAD_PARAMS, 400)
+        if pages is not None and (min(pages) < 1 or len(pages) > MAX_PAGES_PER_REQUEST):
+            logger.warning("Invalid page parameters in request")
+            return _json_response(_ERR_BAD_PAGES, 400)
+
         db_start = time.time()
         user = get_jwt_identity()
-        logger.debug(f"User identity: {user}")
-        athlete = db.get_athlete_by_id(user["id"])
+        logger.debug("User identity: %s", user)
+        athlete = _current_athlete()
         db_duration = (time.time() - db_start) * 1000
-        logger.info(f"[TIMING] Database lookup: {db_duration:.2f}ms")
+        timing_logger.info("[TIMING] Database lookup: %.2fms", db_duration)
         
         if not athlete:
-            logger.warning(f"User not found in database (ID: {user['id']})")
-            return jsonify({"error": "User not found in database"}), 404
-        
-        now = datetime.now()
-        expires_at = athlete['expires_at']
+            logger.warning("User not found in database (ID: %s)", user['id'])
+            return _json_response(_ERR_USER_NOT_FOUND, 404)
         
-        if expires_at <= now:
+        # expires_at is a Unix timestamp. The background refresher normally renews
+        # tokens ahead of time; this covers anything it missed
+        if h.token_expired(athlete):
             # Token is expired, refresh it
             logger.info("Access token expired, refreshing...")
             token_refresh_start = time.time()
-            new_access_token, new_expires_at = h.refresh_strava_token(
-                athlete['refresh_token'], CLIENT_ID, CLIENT_SECRET
-            )
-            # Update database with new access token (refresh token stays the same)
-            db.update_athlete_tokens(user["id"], new_access_token, athlete['refresh_token'], new_expires_at)
-            # Update athlete dict with new access token for this request
-            athlete['access_token'] = new_access_token
-            athlete['expires_at'] = new_expires_at
+            # Locks the athlete's row, so this can't spend the single-use refresh token
+            # alongside the background refresher or a parallel request; updates athlete
+            h.refresh_token_now(athlete, CLIENT_ID, CLIENT_SECRET)
             token_refresh_duration = (time.time() - token_refresh_start) * 1000
-            logger.info(f"[TIMING] Token refresh: {token_refresh_duration:.2f}ms")
+            timing_logger.info("[TIMING] Token refresh: %.2fms", token_refresh_duration)
+        else:
+            # Still valid: use it for this request, but renew it in the background if it expires soon
+            h.refresh_token_ahead(athlete, CLIENT_ID, CLIENT_SECRET)
+
+        if pages is None:
+            # No page requested: stream the whole date range back as Strava pages arrive
+            h.log_query(athlete["strava_id"], after, before)
+            page_results = h.iter_activity_pages(athlete, after, before)
+            # Fetch page 1 before committing to a 200, so a failure there still gets a 502
+            first_page = next(page_results)
+            page_results = itertools.chain((first_page,), page_results)
+            return app.response_class(stream_activities(page_results, request_start), mimetype='application/json'), 200
 
         fetch_start = time.time()
-        activities_list = h.fetch_activities(athlete, after, before, page=page)
+        activities_json, count = h.fetch_activity_pages_json(athlete, after, before, pages)
         fetch_duration = (time.time() - fetch_start) * 1000
-        logger.info(f"[TIMING] Total fetch_activities call: {fetch_duration:.2f}ms")
+        timing_logger.info("[TIMING] Total Strava fetch: %.2fms", fetch_duration)
         
         h.log_query(athlete["strava_id"], after, before)
         
-        json_start = time.time()
-        response_data = jsonify({
-            "activities": activities_list,
-            "count": len(activities_list),
-            "success": True
-        })
-        json_duration = (time.time() - json_start) * 1000
-        logger.info(f"[TIMING] JSON serialization: {json_duration:.2f}ms")
+        # Splice Strava's activity array into the response as-is rather than re-serializing it
+        body = b'{"activities":%s,"count":%d,"success":true}' % (activities_json, count)
+        response_data = app.response_class(body, mimetype='application/json')
+        # Tag the body so a client re-requesting the same pages gets an empty 304 when
+        # nothing changed, and may reuse its copy without asking for a short while
+        response_data.set_etag(hashlib.blake2b(body, digest_size=12).hexdigest())
+        response_data.cache_control.private = True
+        response_data.cache_control.max_age = ACTIVITIES_MAX_AGE
+        response_data.make_conditional(request)
         
         total_duration = (time.time() - request_start) * 1000
-        logger.info(f"[TIMING] Total endpoint time (page {page}): {total_duration:.2f}ms - Returned {len(activities_list)} activities")
+        timing_logger.info("[TIMING] Total endpoint time (pages %s): %.2fms - Returned %d activities", pages, total_duration, count)
         
-        return response_data, 200
+        # make_conditional sets the status (200 or 304)
+        return response_data
+    
+    except h.StravaFetchError as e:
+        # A page is missing, so the result would be incomplete: never send (or ETag) it
+        logger.error("Failed to fetch activities: %s", e)
+        return _json_response(_ERR_STRAVA_FETCH, 502)
     
     except Exception as e:
-        logger.error(f"Failed to fetch activities: {str(e)}", exc_info=True)
+        logger.error("Failed to fetch activities: %s", e, exc_info=True)
         return jsonify({"error": f"Failed to fetch activities: {str(e)}"}), 500
 
 if __name__ == "__main__":
@@ -318,6 +488,7 @@ if __name__ == "__main__":
     # Set logging level based on verbose flag
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
+        timing_logger.setLevel(logging.NOTSET)
         logger.info("Verbose mode enabled - logging level set to DEBUG")
     else:
         logging.getLogger().setLevel(logging.INFO)
@@ -325,10 +496,11 @@ if __name__ == "__main__":
     # Use PORT from environment (Render provides this), default to 3011 for local
     port = int(os.getenv('PORT', 3011))
     
-    logger.info(f"Starting server on port {port}")
-    logger.info(f"Frontend URL: {FRONTEND_URL}")
-    logger.info(f"Secure mode: {SECURE}")
+    logger.info("Starting server on port %s", port)
+    logger.info("Frontend URL: %s", FRONTEND_URL)
+    logger.info("Secure mode: %s", SECURE)
     
+    # This is Flask's development server; production runs under gunicorn (see gunicorn.conf.py)
     # Use 0.0.0.0 to accept connections from any IP (required for cloud hosting)
     # Disable debug mode in production (check RENDER env var)
     debug_mode = not bool(os.getenv('RENDER'))
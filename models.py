@@ -4,7 +4,7 @@ from datetime import datetime
 db = SQLAlchemy()
 
 class User(db.Model):
-    strava_id = db.Column(db.String(64), unique=True, nullable=False, primary_key=True)
+    strava_id = db.Column(db.BigInteger, unique=True, nullable=False, primary_key=True)
     access_token = db.Column(db.String(255), nullable=False)
     refresh_token = db.Column(db.String(255), nullable=False)
     token_expires_at = db.Column(db.Integer, nullable=False)
@@ -14,6 +14,6 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Log(db.Model):
-    strava_id = db.Column(db.String(64), db.ForeignKey('user.strava_id'), primary_key=True)
+    strava_id = db.Column(db.BigInteger, db.ForeignKey('user.strava_id'), primary_key=True)
     action = db.Column(db.String(255), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, primary_key=True)
\ No newline at end of file
@@ -34,17 +34,16 @@ This script references the stravalib model files:
 import sys
 import os
 import argparse
+import contextlib
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pprint import pprint
 
 # Add parent directory to path to import modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from stravalib import Client
-from dotenv import load_dotenv
-from db import db_utils as db
-import helpers as h
-
 # Import stravalib models to inspect them
 try:
     from stravalib import strava_model
@@ -56,17 +55,70 @@ except ImportError:
     except ImportError:
         STRAVA_MODEL_AVAILABLE = False
 
-# Load environment variables
-load_dotenv()
-CLIENT_ID = os.getenv('CLIENT_ID')
-CLIENT_SECRET = os.getenv('CLIENT_SECRET')
+# numpy is optional: it only speeds up the stream statistics in --verbose mode
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Horizontal rules around section and per-activity headers
+SECTION_RULE = '=' * 80
+ACTIVITY_RULE = '─' * 80
+
+# Substrings (matched against lowercased field names) that put a field in each category
+MODEL_FIELD_CATEGORIES = {
+    'hr': ('heart',),
+    'power': ('power', 'watt'),
+    'cadence': ('cadence',),
+    'speed': ('speed',),
+}
+ACTIVITY_FIELD_CATEGORIES = {
+    'hr': ('heart', 'hr'),
+    'power': ('power', 'watt'),
+    'cadence': ('cadence',),
+}
+
+
+def categorize_fields(field_names, categories):
+    """Bucket field names by category in one pass, lowercasing each name once"""
+    buckets = {category: [] for category in categories}
+    for field in field_names:
+        lowered = field.lower()
+        for category, substrings in categories.items():
+            if any(substring in lowered for substring in substrings):
+                buckets[category].append(field)
+    return buckets
+
+
+@functools.lru_cache(maxsize=None)
+def _fields_of(cls):
+    """Field names of a (pydantic v2 or v1) stravalib model class, in definition order"""
+    if hasattr(cls, 'model_fields'):
+        return tuple(cls.model_fields)
+    if hasattr(cls, '__fields__'):
+        return tuple(cls.__fields__)
+    return ()
+
+
+@functools.lru_cache(maxsize=None)
+def _model_field_buckets(cls):
+    """categorize_fields() of a model class's fields, resolved once per class"""
+    return categorize_fields(_fields_of(cls), MODEL_FIELD_CATEGORIES)
+
+
+@functools.lru_cache(maxsize=None)
+def _activity_field_buckets(cls):
+    """Alphabetical categorize_fields() of an activity class's fields, resolved once per class"""
+    return categorize_fields(sorted(_fields_of(cls)), ACTIVITY_FIELD_CATEGORIES)
 
 
 def print_section(title):
-    """Print a formatted section header"""
-    print(f"\n{'='*80}")
+    """Print a formatted section header, flushing the previous section first"""
+    sys.stdout.flush()
+    print(f"\n{SECTION_RULE}")
     print(f"  {title}")
-    print(f"{'='*80}\n")
+    print(f"{SECTION_RULE}\n")
 
 
 def inspect_model_definitions():
@@ -87,19 +139,11 @@ def inspect_model_definitions():
         print("📋 SummaryActivity (from get_activities()):")
         print("   This is what you get when calling client.get_activities()\n")
         
-        # Get model fields using Pydantic
-        if hasattr(summary_activity, 'model_fields'):
-            fields = summary_activity.model_fields
-        elif hasattr(summary_activity, '__fields__'):
-            fields = summary_activity.__fields__
-        else:
-            fields = {}
-        
+        fields = _fields_of(summary_activity)
         # Look for heart rate and performance related fields
-        hr_fields = [f for f in fields.keys() if 'heart' in f.lower()]
-        power_fields = [f for f in fields.keys() if 'power' in f.lower() or 'watt' in f.lower()]
-        cadence_fields = [f for f in fields.keys() if 'cadence' in f.lower()]
-        speed_fields = [f for f in fields.keys() if 'speed' in f.lower()]
+        buckets = _model_field_buckets(summary_activity)
+        hr_fields, power_fields = buckets['hr'], buckets['power']
+        cadence_fields, speed_fields = buckets['cadence'], buckets['speed']
         
         print(f"   Total fields: {len(fields)}")
         print(f"   Heart rate fields: {hr_fields if hr_fields else 'NONE ⚠️'}")
@@ -112,16 +156,9 @@ def inspect_model_definitions():
         print("📋 DetailedActivity (from get_activity(id)):")
         print("   This is what you get when calling client.get_activity(activity_id)\n")
         
-        if hasattr(detailed_activity, 'model_fields'):
-            fields = detailed_activity.model_fields
-        elif hasattr(detailed_activity, '__fields__'):
-            fields = detailed_activity.__fields__
-        else:
-            fields = {}
-        
-        hr_fields = [f for f in fields.keys() if 'heart' in f.lower()]
-        power_fields = [f for f in fields.keys() if 'power' in f.lower() or 'watt' in f.lower()]
-        cadence_fields = [f for f in fields.keys() if 'cadence' in f.lower()]
+        fields = _fields_of(detailed_activity)
+        buckets = _model_field_buckets(detailed_activity)
+        hr_fields, power_fields, cadence_fields = buckets['hr'], buckets['power'], buckets['cadence']
         
         print(f"   Total fields: {len(fields)}")
         print(f"   Heart rate fields: {hr_fields if hr_fields else 'NONE ⚠️'}")
@@ -130,9 +167,7 @@ def inspect_model_definitions():
         
         # Show additional fields only in detailed
         if summary_activity:
-            summary_fields = set(getattr(summary_activity, 'model_fields', getattr(summary_activity, '__fields__', {})).keys())
-            detailed_fields = set(fields.keys())
-            extra_fields = detailed_fields - summary_fields
+            extra_fields = set(fields).difference(_fields_of(summary_activity))
             print(f"   Extra fields vs Summary: {sorted(extra_fields)}")
         print()
     
@@ -140,16 +175,9 @@ def inspect_model_definitions():
         print("📋 DetailedSegmentEffort (in segment_efforts and best_efforts):")
         print("   Segment efforts within an activity contain per-segment metrics\n")
         
-        if hasattr(detailed_segment_effort, 'model_fields'):
-            fields = detailed_segment_effort.model_fields
-        elif hasattr(detailed_segment_effort, '__fields__'):
-            fields = detailed_segment_effort.__fields__
-        else:
-            fields = {}
-        
-        hr_fields = [f for f in fields.keys() if 'heart' in f.lower()]
-        power_fields = [f for f in fields.keys() if 'power' in f.lower() or 'watt' in f.lower()]
-        cadence_fields = [f for f in fields.keys() if 'cadence' in f.lower()]
+        fields = _fields_of(detailed_segment_effort)
+        buckets = _model_field_buckets(detailed_segment_effort)
+        hr_fields, power_fields, cadence_fields = buckets['hr'], buckets['power'], buckets['cadence']
         
         print(f"   Total fields: {len(fields)}")
         print(f"   Heart rate fields: {hr_fields if hr_fields else 'None'} ✓")
@@ -161,16 +189,9 @@ def inspect_model_definitions():
         print("📋 Lap (in laps array of DetailedActivity):")
         print("   Laps contain per-lap metrics\n")
         
-        if hasattr(lap, 'model_fields'):
-            fields = lap.model_fields
-        elif hasattr(lap, '__fields__'):
-            fields = lap.__fields__
-        else:
-            fields = {}
-        
-        hr_fields = [f for f in fields.keys() if 'heart' in f.lower()]
-        power_fields = [f for f in fields.keys() if 'power' in f.lower() or 'watt' in f.lower()]
-        cadence_fields = [f for f in fields.keys() if 'cadence' in f.lower()]
+        fields = _fields_of(lap)
+        buckets = _model_field_buckets(lap)
+        hr_fields, power_fields, cadence_fields = buckets['hr'], buckets['power'], buckets['cadence']
         
         print(f"   Total fields: {len(fields)}")
         print(f"   Heart rate fields: {hr_fields if hr_fields else 'None'}")
@@ -188,6 +209,20 @@ def inspect_model_definitions():
     print()
 
 
+# dict(activity) walks every field of the model, and the same detailed activity
+# goes through several analyses; convert each activity once. The activity is
+# kept alongside its dict so its id() can't be reused while cached
+_activity_dicts = {}
+
+
+def _as_dict(activity):
+    """dict(activity), computed once per activity object"""
+    entry = _activity_dicts.get(id(activity))
+    if entry is None:
+        entry = _activity_dicts[id(activity)] = (activity, dict(activity))
+    return entry[1]
+
+
 def print_activity_summary(activity, index=None):
     """Print a summary of an activity"""
     prefix = f"Activity {index}: " if index is not None else "Activity: "
@@ -201,22 +236,14 @@ def print_activity_summary(activity, index=None):
 
 def analyze_activity_fields(activity, detailed=False):
     """Analyze and display all available fields in an activity object"""
-    activity_dict = dict(activity)
-    
     label = "DETAILED ACTIVITY" if detailed else "SUMMARY ACTIVITY"
     print_section(f"{label} FIELDS - Activity ID: {activity.id}")
     
-    # Get all fields
-    all_fields = sorted(activity_dict.keys())
-    
-    # Categorize fields
-    hr_fields = [f for f in all_fields if 'heart' in f.lower() or 'hr' in f.lower()]
-    time_fields = [f for f in all_fields if 'time' in f.lower() or 'date' in f.lower()]
-    distance_fields = [f for f in all_fields if 'distance' in f.lower() or 'meter' in f.lower()]
-    pace_speed_fields = [f for f in all_fields if 'pace' in f.lower() or 'speed' in f.lower()]
-    power_fields = [f for f in all_fields if 'power' in f.lower() or 'watt' in f.lower()]
-    cadence_fields = [f for f in all_fields if 'cadence' in f.lower()]
-    elevation_fields = [f for f in all_fields if 'elev' in f.lower() or 'altitude' in f.lower()]
+    # Field names and categories come from the model class; only the values
+    # actually printed are read from the activity
+    all_fields = _fields_of(type(activity))
+    buckets = _activity_field_buckets(type(activity))
+    hr_fields, power_fields, cadence_fields = buckets['hr'], buckets['power'], buckets['cadence']
     
     print(f"Total fields: {len(all_fields)}\n")
     
@@ -224,7 +251,7 @@ def analyze_activity_fields(activity, detailed=False):
     if hr_fields:
         print("❤️  HEART RATE FIELDS:")
         for field in hr_fields:
-            value = activity_dict.get(field)
+            value = getattr(activity, field, None)
             print(f"  {field:30s} = {value}")
     else:
         print("❤️  HEART RATE FIELDS: None found")
@@ -235,7 +262,7 @@ def analyze_activity_fields(activity, detailed=False):
     if power_fields:
         print("⚡ POWER FIELDS:")
         for field in power_fields:
-            value = activity_dict.get(field)
+            value = getattr(activity, field, None)
             print(f"  {field:30s} = {value}")
     else:
         print("⚡ POWER FIELDS: None found")
@@ -246,7 +273,7 @@ def analyze_activity_fields(activity, detailed=False):
     if cadence_fields:
         print("🔄 CADENCE FIELDS:")
         for field in cadence_fields:
-            value = activity_dict.get(field)
+            value = getattr(activity, field, None)
             print(f"  {field:30s} = {value}")
     else:
         print("🔄 CADENCE FIELDS: None found")
@@ -262,23 +289,68 @@ def analyze_activity_fields(activity, detailed=False):
     
     print("📊 KEY FIELDS:")
     for field in important_fields:
-        if field in activity_dict:
-            value = activity_dict.get(field)
+        if field in all_fields:
+            value = getattr(activity, field, None)
             print(f"  {field:30s} = {value}")
-    
-    return activity_dict
 
 
-def fetch_activity_streams(client, activity_id, verbose=False):
-    """Fetch and display activity streams (time-series data)"""
+def stream_stats(data):
+    """Return (min, max, mean) of a stream's non-None values, or None if there are none"""
+    if np is not None:
+        values = np.fromiter((x for x in data if x is not None), dtype=np.float64)
+        if not values.size:
+            return None
+        return values.min(), values.max(), values.mean()
+    
+    # Without numpy: one pass, no intermediate list
+    count = 0
+    total = 0.0
+    low = high = None
+    for x in data:
+        if x is None:
+            continue
+        count += 1
+        total += x
+        if low is None or x < low:
+            low = x
+        if high is None or x > high:
+            high = x
+    if not count:
+        return None
+    return low, high, total / count
+
+
+# Available stream types: time, distance, latlng, altitude, velocity_smooth,
+# heartrate, cadence, watts, temp, moving, grade_smooth
+STREAM_TYPES = ['time', 'heartrate', 'cadence', 'watts', 'altitude', 'distance']
+
+
+def stream_resolution(verbose):
+    """Sampling to request streams at: native for --verbose, which prints and
+    summarizes the values, otherwise Strava's 'low' (about 100 points), since
+    only the stream metadata is shown and original_size still gives the full length"""
+    return None if verbose else 'low'
+
+
+def request_activity_streams(client, activity_id, pool, verbose=False):
+    """Start fetching an activity's streams on the pool, so the request overlaps other API calls"""
+    return pool.submit(client.get_activity_streams, activity_id, types=STREAM_TYPES,
+                       resolution=stream_resolution(verbose))
+
+
+def fetch_activity_streams(client, activity_id, verbose=False, pending=None):
+    """Fetch and display activity streams (time-series data).
+
+    pending is a future from request_activity_streams, if the fetch was already started.
+    """
     print_section(f"ACTIVITY STREAMS - Activity ID: {activity_id}")
     
-    # Available stream types: time, distance, latlng, altitude, velocity_smooth,
-    # heartrate, cadence, watts, temp, moving, grade_smooth
-    stream_types = ['time', 'heartrate', 'cadence', 'watts', 'altitude', 'distance']
-    
     try:
-        streams = client.get_activity_streams(activity_id, types=stream_types)
+        if pending is not None:
+            streams = pending.result()
+        else:
+            streams = client.get_activity_streams(activity_id, types=STREAM_TYPES,
+                                                  resolution=stream_resolution(verbose))
         
         print(f"Available stream types: {list(streams.keys())}\n")
         
@@ -291,18 +363,18 @@ def fetch_activity_streams(client, activity_id, verbose=False):
             
             if verbose and stream.data:
                 # Show first and last few data points
-                data_preview = stream.data[:5] if len(stream.data) > 5 else stream.data
-                print(f"  First values: {data_preview}")
+                print(f"  First values: {stream.data[:5]}")
                 if len(stream.data) > 5:
                     print(f"  Last values: {stream.data[-5:]}")
                 
                 # Calculate stats for numeric streams
                 if stream_type in ['heartrate', 'cadence', 'watts', 'altitude']:
-                    numeric_data = [x for x in stream.data if x is not None]
-                    if numeric_data:
-                        print(f"  Min: {min(numeric_data)}")
-                        print(f"  Max: {max(numeric_data)}")
-                        print(f"  Avg: {sum(numeric_data) / len(numeric_data):.2f}")
+                    stats = stream_stats(stream.data)
+                    if stats:
+                        low, high, mean = stats
+                        print(f"  Min: {low:g}")
+                        print(f"  Max: {high:g}")
+                        print(f"  Avg: {mean:.2f}")
             
             print()
         
@@ -317,7 +389,7 @@ def analyze_segment_efforts_for_hr(activity, verbose=False):
     """Analyze segment efforts to find heart rate data"""
     print_section(f"SEGMENT EFFORTS HEART RATE - Activity ID: {activity.id}")
     
-    activity_dict = dict(activity)
+    activity_dict = _as_dict(activity)
     segment_efforts = activity_dict.get('segment_efforts', [])
     
     if not segment_efforts:
@@ -327,43 +399,45 @@ def analyze_segment_efforts_for_hr(activity, verbose=False):
     
     print(f"Found {len(segment_efforts)} segment efforts\n")
     
-    hr_data = []
+    # One pass: running count/sum/min over average HR and max over max HR
+    hr_count = avg_count = 0
+    avg_sum = 0.0
+    avg_min = max_max = None
     for i, effort in enumerate(segment_efforts, 1):
-        effort_dict = dict(effort)
-        avg_hr = effort_dict.get('average_heartrate')
-        max_hr = effort_dict.get('max_heartrate')
-        segment_name = effort_dict.get('name', 'Unknown')
+        avg_hr = getattr(effort, 'average_heartrate', None)
+        max_hr = getattr(effort, 'max_heartrate', None)
         
         if avg_hr or max_hr:
-            hr_data.append({
-                'name': segment_name,
-                'avg_hr': avg_hr,
-                'max_hr': max_hr
-            })
+            hr_count += 1
+            if avg_hr:
+                avg_count += 1
+                avg_sum += avg_hr
+                if avg_min is None or avg_hr < avg_min:
+                    avg_min = avg_hr
+            if max_hr and (max_max is None or max_hr > max_max):
+                max_max = max_hr
             
             if verbose or i <= 3:  # Show first 3 or all if verbose
+                segment_name = getattr(effort, 'name', None) or 'Unknown'
                 print(f"Segment {i}: {segment_name}")
                 print(f"  Average HR: {avg_hr if avg_hr else 'N/A'} bpm")
                 print(f"  Max HR: {max_hr if max_hr else 'N/A'} bpm")
                 print()
     
-    if hr_data:
-        # Calculate overall stats
-        avg_hrs = [d['avg_hr'] for d in hr_data if d['avg_hr']]
-        max_hrs = [d['max_hr'] for d in hr_data if d['max_hr']]
-        
+    if hr_count:
         print(f"📊 SUMMARY:")
-        print(f"  Segments with HR data: {len(hr_data)} / {len(segment_efforts)}")
-        if avg_hrs:
-            print(f"  Average HR across segments: {sum(avg_hrs) / len(avg_hrs):.1f} bpm")
-            print(f"  HR range: {min(avg_hrs):.0f} - {max(max_hrs):.0f} bpm")
+        print(f"  Segments with HR data: {hr_count} / {len(segment_efforts)}")
+        if avg_count:
+            print(f"  Average HR across segments: {avg_sum / avg_count:.1f} bpm")
+            if max_max is not None:
+                print(f"  HR range: {avg_min:.0f} - {max_max:.0f} bpm")
     else:
         print("❌ No heart rate data found in segment efforts")
         print("   This could mean:")
         print("   • The activity wasn't recorded with a heart rate monitor")
         print("   • HR data is private/hidden in Strava settings")
     
-    return hr_data
+    return hr_count
 
 
 def compare_summary_vs_detailed(client, activity_id):
@@ -374,7 +448,7 @@ def compare_summary_vs_detailed(client, activity_id):
     # from get_activities(), now get detailed
     try:
         detailed = client.get_activity(activity_id)
-        detailed_dict = dict(detailed)
+        detailed_dict = _as_dict(detailed)
         
         print("Fields only available in DETAILED view:")
         print("(Note: This shows fields that might have more data in detailed view)\n")
@@ -428,6 +502,11 @@ def main():
     
     args = parser.parse_args()
     
+    # Block-buffer stdout: a verbose run prints hundreds of lines per activity,
+    # and a line-buffered terminal would flush after every one of them
+    # (print_section flushes at section boundaries so progress stays visible)
+    sys.stdout.reconfigure(line_buffering=False)
+    
     # If just showing models, do that and exit
     if args.show_models:
         inspect_model_definitions()
@@ -437,6 +516,15 @@ def main():
     if not args.athlete_id:
         parser.error('--athlete-id is required (unless using --show-models)')
     
+    # Imported here so --show-models doesn't load the environment, open the
+    # database pool or pull in the API client
+    from dotenv import load_dotenv
+    load_dotenv()
+    from db import db_utils as db
+    import helpers as h
+    CLIENT_ID = os.getenv('CLIENT_ID')
+    CLIENT_SECRET = os.getenv('CLIENT_SECRET')
+    
     print_section("STRAVALIB MODEL EXPLORER")
     print(f"Athlete ID: {args.athlete_id}")
     print(f"Limit: {args.limit}")
@@ -465,69 +553,78 @@ def main():
     if args.verbose:
         inspect_model_definitions()
     
-    if args.activity_id:
-        # Analyze specific activity
-        print(f"\n📊 Analyzing activity {args.activity_id}...")
-        try:
-            activity = client.get_activity(args.activity_id)
-            print_activity_summary(activity)
-            analyze_activity_fields(activity, detailed=True)
+    # The detailed activity and its streams are independent requests; with
+    # --streams, the streams are fetched on this pool while the rest runs
+    with ThreadPoolExecutor(max_workers=1) if args.streams else contextlib.nullcontext() as pool:
+        if args.activity_id:
+            # Analyze specific activity
+            print(f"\n📊 Analyzing activity {args.activity_id}...")
+            streams = request_activity_streams(client, args.activity_id, pool, args.verbose) if args.streams else None
+            try:
+                activity = client.get_activity(args.activity_id)
+                print_activity_summary(activity)
+                analyze_activity_fields(activity, detailed=True)
+                
+                # Check segment efforts for HR
+                analyze_segment_efforts_for_hr(activity, verbose=args.verbose)
+                
+                if args.streams:
+                    fetch_activity_streams(client, args.activity_id, verbose=args.verbose, pending=streams)
+            except Exception as e:
+                print(f"❌ Error fetching activity: {e}")
+                return 1
+        else:
+            # Fetch recent activities
+            print(f"\n📅 Fetching last {args.limit} activities...")
+            
+            # Get activities from last 90 days. The iterator fetches pages on demand, so
+            # the first activity can be analyzed as soon as the first page arrives
+            after = datetime.now() - timedelta(days=90)
+            activities = iter(client.get_activities(after=after, limit=args.limit))
+            first_activity = next(activities, None)
             
-            # Check segment efforts for HR
-            analyze_segment_efforts_for_hr(activity, verbose=args.verbose)
+            if first_activity is None:
+                print("❌ No activities found in the last 90 days")
+                return 1
             
+            streams = request_activity_streams(client, first_activity.id, pool, args.verbose) if args.streams else None
+            
+            # Analyze first activity in detail
+            print_section("ANALYZING FIRST ACTIVITY")
+            print_activity_summary(first_activity)
+            
+            # Show summary fields
+            print("\n" + ACTIVITY_RULE)
+            print("SUMMARY ACTIVITY DATA:")
+            print(ACTIVITY_RULE)
+            analyze_activity_fields(first_activity, detailed=False)
+            
+            # Show detailed fields if requested
+            if args.detailed:
+                print("\n" + ACTIVITY_RULE)
+                print("FETCHING DETAILED ACTIVITY DATA:")
+                print(ACTIVITY_RULE)
+                detailed_activity = compare_summary_vs_detailed(client, first_activity.id)
+                if detailed_activity:
+                    analyze_activity_fields(detailed_activity, detailed=True)
+                    # Analyze segment efforts for heart rate
+                    analyze_segment_efforts_for_hr(detailed_activity, verbose=args.verbose)
+            
+            # Show streams if requested
             if args.streams:
-                fetch_activity_streams(client, args.activity_id, verbose=args.verbose)
-        except Exception as e:
-            print(f"❌ Error fetching activity: {e}")
-            return 1
-    else:
-        # Fetch recent activities
-        print(f"\n📅 Fetching last {args.limit} activities...")
-        
-        # Get activities from last 90 days
-        after = datetime.now() - timedelta(days=90)
-        activities = list(client.get_activities(after=after, limit=args.limit))
-        
-        print(f"✓ Found {len(activities)} activities\n")
-        
-        if not activities:
-            print("❌ No activities found in the last 90 days")
-            return 1
-        
-        # Analyze first activity in detail
-        print_section("ANALYZING FIRST ACTIVITY")
-        first_activity = activities[0]
-        print_activity_summary(first_activity)
-        
-        # Show summary fields
-        print("\n" + "─" * 80)
-        print("SUMMARY ACTIVITY DATA:")
-        print("─" * 80)
-        analyze_activity_fields(first_activity, detailed=False)
-        
-        # Show detailed fields if requested
-        if args.detailed:
-            print("\n" + "─" * 80)
-            print("FETCHING DETAILED ACTIVITY DATA:")
-            print("─" * 80)
-            detailed_activity = compare_summary_vs_detailed(client, first_activity.id)
-            if detailed_activity:
-                analyze_activity_fields(detailed_activity, detailed=True)
-                # Analyze segment efforts for heart rate
-                analyze_segment_efforts_for_hr(detailed_activity, verbose=args.verbose)
-        
-        # Show streams if requested
-        if args.streams:
-            fetch_activity_streams(client, first_activity.id, verbose=args.verbose)
+                fetch_activity_streams(client, first_activity.id, verbose=args.verbose, pending=streams)
+            
+            # Only now pull the rest of the activities
+            other_activities = list(itertools.islice(activities, args.limit - 1))
+            print(f"\n✓ Found {len(other_activities) + 1} activities")
+            
+            # List other activities
+            if other_activities:
+                print_section(f"OTHER ACTIVITIES (showing {len(other_activities)} more)")
+                for i, activity in enumerate(other_activities, start=2):
+                    print_activity_summary(activity, index=i)
+                    print()
         
-        # List other activities
-        if len(activities) > 1:
-            print_section(f"OTHER ACTIVITIES (showing {len(activities) - 1} more)")
-            for i, activity in enumerate(activities[1:], start=2):
-                print_activity_summary(activity, index=i)
-                print()
-    
     print_section("SUMMARY & RECOMMENDATIONS")
     print("✓ Analysis complete!")
     print("\n🔍 Key takeaways:")
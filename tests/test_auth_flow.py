@@ -10,90 +10,113 @@ The test will:
 - Authenticate using the code (creates/updates user in database)
 - Verify whoami endpoint (reads from database)
 - Fetch activities (uses stored tokens from database)
+
+Each flow's requests go through one requests.Session, so the connection to the
+backend is reused and the login cookies are sent on every later call automatically.
+To exercise several users at once, list one auth code per user in AUTH_CODES
+(or the AUTH_CODES environment variable, comma-separated); their flows run
+concurrently, one thread and session each.
+
+It also runs under pytest, one test_flow per auth code in the AUTH_CODES
+environment variable (skipped without it, or if the backend isn't running), and
+with pytest-xdist (`pytest -s -n auto tests/test_auth_flow.py`) each user's flow
+runs in its own worker process.
 """
 
+import os
+import pytest
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import json
+import orjson
 
 # Configuration
 BASE_URL = "http://localhost:3011"
 AUTH_CODE = "37d07a6d04c03d4eb520f6f1748b823a73e9e5b7"  # Replace with your actual auth code from Strava
+AUTH_CODES = os.getenv('AUTH_CODES', AUTH_CODE).split(',')  # One code per user; flows run concurrently
+MAX_CONCURRENT_FLOWS = 16
+
+# Retry idempotent requests (GETs) on transient gateway errors. POSTs are
+# never retried: the login code is one-time-use. 502 is left out because the
+# backend itself answers 502 when Strava fails, and that should reach the test
+# as-is; once retries run out the last response is returned rather than raised
+RETRY = Retry(total=3, backoff_factor=0.3, status_forcelist=(503, 504), raise_on_status=False)
 
 # Date range for activities (last 30 days)
 end_date = datetime.now()
 start_date = end_date - timedelta(days=30)
+# The API takes whole-second Unix timestamps (ISO strings are rejected with a 400)
+AFTER_TS = int(start_date.timestamp())
+BEFORE_TS = int(end_date.timestamp())
+
 
+def _dumps(response):
+    """Pretty-print a JSON response body (orjson, as the backend uses)"""
+    return orjson.dumps(orjson.loads(response.content), option=orjson.OPT_INDENT_2).decode()
 
-def test_login():
+
+def test_login(session, auth_code):
     """Test the login endpoint"""
     print("\n" + "="*60)
-    print("Testing /auth/login endpoint...")
+    print("Testing /api/auth/login endpoint...")
     print("="*60)
     
-    response = requests.post(
-        f"{BASE_URL}/auth/login",
-        json={"code": AUTH_CODE},
-        headers={"Content-Type": "application/json"}
+    response = session.post(
+        f"{BASE_URL}/api/auth/login",
+        json={"code": auth_code}
     )
     
     print(f"Status Code: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    print(f"Response: {_dumps(response)}")
     
     if response.status_code == 200:
         print("✅ Login successful!")
-        # Extract cookies for subsequent requests
-        return response.cookies
+        # The session keeps the cookies for subsequent requests
+        return True
     else:
         print("❌ Login failed!")
-        return None
+        return False
 
 
-def test_whoami(cookies):
+def test_whoami(session):
     """Test the whoami endpoint"""
     print("\n" + "="*60)
-    print("Testing /auth/whoami endpoint...")
+    print("Testing /api/auth/whoami endpoint...")
     print("="*60)
     
-    response = requests.get(
-        f"{BASE_URL}/auth/whoami",
-        cookies=cookies
-    )
+    response = session.get(f"{BASE_URL}/api/auth/whoami")
     
     print(f"Status Code: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    print(f"Response: {_dumps(response)}")
     
     if response.status_code == 200:
         print("✅ Whoami successful! User data retrieved from database.")
     else:
         print("❌ Whoami failed!")
     
-    return response.json() if response.status_code == 200 else None
+    return orjson.loads(response.content) if response.status_code == 200 else None
 
 
-def test_get_activities(cookies):
+def test_get_activities(session):
     """Test the get activities endpoint"""
     print("\n" + "="*60)
-    print("Testing /activities endpoint...")
+    print("Testing /api/activities endpoint...")
     print("="*60)
     
-    # Format dates for API
-    after_str = start_date.isoformat()
-    before_str = end_date.isoformat()
-    
-    response = requests.get(
-        f"{BASE_URL}/activities",
+    response = session.get(
+        f"{BASE_URL}/api/activities",
         params={
-            "after": after_str,
-            "before": before_str
-        },
-        cookies=cookies
+            "after": AFTER_TS,
+            "before": BEFORE_TS
+        }
     )
     
     print(f"Status Code: {response.status_code}")
     
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         print(f"✅ Activities fetched successfully!")
         print(f"Number of activities: {data.get('count', 0)}")
         
@@ -114,19 +137,16 @@ def test_get_activities(cookies):
         return None
 
 
-def test_logout(cookies):
+def test_logout(session):
     """Test the logout endpoint"""
     print("\n" + "="*60)
-    print("Testing /auth/logout endpoint...")
+    print("Testing /api/auth/logout endpoint...")
     print("="*60)
     
-    response = requests.post(
-        f"{BASE_URL}/auth/logout",
-        cookies=cookies
-    )
+    response = session.post(f"{BASE_URL}/api/auth/logout")
     
     print(f"Status Code: {response.status_code}")
-    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    print(f"Response: {_dumps(response)}")
     
     if response.status_code == 200:
         print("✅ Logout successful!")
@@ -134,6 +154,64 @@ def test_logout(cookies):
         print("❌ Logout failed!")
 
 
+def new_session():
+    """A requests.Session that retries transient backend failures"""
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=RETRY)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def run_flow(auth_code):
+    """Run login → whoami → activities → logout for one user on its own session.
+    Returns (logged_in, user_data, activities_data)"""
+    with new_session() as session:
+        # Test 1: Login
+        logged_in = test_login(session, auth_code)
+        if not logged_in:
+            print("\n❌ Cannot continue testing - login failed")
+            return False, None, None
+        
+        # Test 2: Whoami
+        user_data = test_whoami(session)
+        
+        # Test 3: Get Activities
+        activities_data = test_get_activities(session)
+        
+        # Test 4: Logout
+        test_logout(session)
+    
+    return True, user_data, activities_data
+
+
+# The steps above share one logged-in session and must run in order, so pytest
+# collects only test_flow below rather than each step on its own
+for _step in (test_login, test_whoami, test_get_activities, test_logout):
+    _step.__test__ = False
+
+
+def pytest_generate_tests(metafunc):
+    """One test_flow per auth code, so pytest-xdist can spread users across workers"""
+    if 'auth_code' in metafunc.fixturenames:
+        metafunc.parametrize('auth_code', AUTH_CODES)
+
+
+def test_flow(auth_code):
+    """pytest entry point: the whole flow for one user"""
+    # Codes are one-time-use, so never spend the hard-coded AUTH_CODE under pytest
+    if not os.getenv('AUTH_CODES'):
+        pytest.skip("Set AUTH_CODES to one or more fresh Strava authorization codes")
+    try:
+        requests.get(f"{BASE_URL}/api/health", timeout=2)
+    except requests.ConnectionError:
+        pytest.skip(f"Backend not reachable at {BASE_URL}")
+    logged_in, user_data, activities_data = run_flow(auth_code)
+    assert logged_in, "login failed"
+    assert user_data, "whoami failed"
+    assert activities_data, "fetching activities failed"
+
+
 def main():
     """Run all tests"""
     print("\n" + "="*60)
@@ -142,34 +220,30 @@ def main():
     print(f"Base URL: {BASE_URL}")
     print(f"Date Range: {start_date.date()} to {end_date.date()}")
     
-    if AUTH_CODE == "YOUR_AUTH_CODE_HERE":
+    if "YOUR_AUTH_CODE_HERE" in AUTH_CODES:
         print("\n❌ ERROR: Please replace AUTH_CODE with your actual Strava authorization code!")
         print("\nTo get an auth code, visit:")
         print("https://www.strava.com/oauth/authorize?client_id=YOUR_CLIENT_ID&response_type=code&redirect_uri=http://localhost&approval_prompt=force&scope=read,activity:read_all")
         return
     
-    # Test 1: Login
-    cookies = test_login()
-    if not cookies:
-        print("\n❌ Cannot continue testing - login failed")
-        return
-    
-    # Test 2: Whoami
-    user_data = test_whoami(cookies)
-    
-    # Test 3: Get Activities
-    activities_data = test_get_activities(cookies)
-    
-    # Test 4: Logout
-    test_logout(cookies)
+    if len(AUTH_CODES) == 1:
+        results = [run_flow(AUTH_CODES[0])]
+    else:
+        # The flows only wait on the backend, so threads overlap them well
+        # (their output interleaves; the summary below is per user)
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_FLOWS, len(AUTH_CODES))) as pool:
+            results = list(pool.map(run_flow, AUTH_CODES))
     
     # Summary
     print("\n" + "="*60)
     print("TEST SUMMARY")
     print("="*60)
-    print(f"✅ Login: {'Success' if cookies else 'Failed'}")
-    print(f"✅ Whoami: {'Success' if user_data else 'Failed'}")
-    print(f"✅ Get Activities: {'Success' if activities_data else 'Failed'}")
+    for i, (logged_in, user_data, activities_data) in enumerate(results, 1):
+        if len(results) > 1:
+            print(f"User {i}:")
+        print(f"✅ Login: {'Success' if logged_in else 'Failed'}")
+        print(f"✅ Whoami: {'Success' if user_data else 'Failed'}")
+        print(f"✅ Get Activities: {'Success' if activities_data else 'Failed'}")
     print("\nAll tests completed!")
     print("="*60)
 
@@ -0,0 +1,99 @@
+"""
+Test that token refreshes lock the athlete row for the whole Strava call.
+
+Strava refresh tokens are single-use: if two workers refresh the same athlete at
+once, one of them spends a token the other already rotated. db_utils prevents this
+with SELECT ... FOR UPDATE SKIP LOCKED, held until the commit after the refresh.
+
+Needs the Oracle database from .env (it is skipped without ORACLE_DSN). It works on
+a throwaway athlete row with a negative ID, which no Strava athlete can have, and
+deletes it afterwards. Run with:
+
+    pytest tests/test_token_refresh_lock.py
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from dotenv import load_dotenv
+
+# Add parent directory to path to import modules
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+load_dotenv()
+if not os.getenv('ORACLE_DSN'):
+    pytest.skip("ORACLE_DSN is not set", allow_module_level=True)
+
+from db import db_utils as db
+
+TEST_ATHLETE_ID = -1
+LOCK_WAIT = 10  # seconds
+
+
+@pytest.fixture
+def expiring_athlete():
+    """A test athlete whose token has already expired"""
+    db.upsert_athlete(TEST_ATHLETE_ID, 'Lock', 'Test', 'old-access', 'old-refresh', 0)
+    yield TEST_ATHLETE_ID
+    with db.get_db_connection() as connection, connection.cursor() as cursor:
+        cursor.execute("DELETE FROM athlete WHERE StravaAthleteID = :id", [TEST_ATHLETE_ID])
+        connection.commit()
+    db._evict_athlete(TEST_ATHLETE_ID)
+
+
+@pytest.fixture
+def autocommit_sessions(monkeypatch):
+    """Hand out sessions left in autocommit, as a careless earlier user of the pool might"""
+    get_db_connection = db.get_db_connection
+
+    def dirty_connection():
+        connection = get_db_connection()
+        connection.autocommit = True
+        return connection
+
+    monkeypatch.setattr(db, 'get_db_connection', dirty_connection)
+
+
+def test_second_locker_skips_row(expiring_athlete, autocommit_sessions):
+    """While one worker is mid-refresh, another must skip the athlete rather than refresh it again"""
+    expires_before = int(time.time())
+    locked = threading.Event()
+    release = threading.Event()
+    spent = []
+
+    def slow_refresh(refresh_token):
+        spent.append(refresh_token)
+        locked.set()
+        release.wait(LOCK_WAIT)
+        return 'new-access', 'new-refresh', int(time.time()) + 6 * 3600
+
+    def second_refresh(refresh_token):
+        # refresh_expiring_tokens may also reach real athletes' rows; raising rolls
+        # their UPDATE back, so the test never commits fake tokens it doesn't own
+        if refresh_token != 'old-refresh':
+            raise RuntimeError("not the test athlete")
+        spent.append(refresh_token)
+        return 'other-access', 'other-refresh', int(time.time()) + 6 * 3600
+
+    first = threading.Thread(target=db.refresh_athlete_tokens,
+                             args=(expiring_athlete, expires_before, slow_refresh))
+    first.start()
+    try:
+        assert locked.wait(LOCK_WAIT), "first refresh never reached Strava"
+        assert db.refresh_athlete_tokens(expiring_athlete, expires_before, second_refresh) is False
+        # Only athletes active in the last minute, to stay clear of real rows where possible
+        active_since = datetime.now() - timedelta(minutes=1)
+        assert db.refresh_expiring_tokens(expires_before, active_since, second_refresh) == 0
+    finally:
+        release.set()
+        first.join(LOCK_WAIT)
+
+    # The refresh token was spent exactly once, and the first worker's tokens were saved
+    assert spent == ['old-refresh']
+    db._evict_athlete(expiring_athlete)
+    athlete = db.get_athlete_by_id(expiring_athlete)
+    assert athlete['refresh_token'] == 'new-refresh'